@@ -1,8 +1,12 @@
 from django.contrib import admin
-from .models import Assignment, TestCase, Submission, Feedback
+from .models import Assignment, AssignmentStatistics, TestCase, Submission, BestSubmission, Feedback, FeedbackJob, GradingJob
 
 # Register your models here.
 admin.site.register(Assignment)
 admin.site.register(TestCase)
 admin.site.register(Submission)
-admin.site.register(Feedback)
\ No newline at end of file
+admin.site.register(BestSubmission)
+admin.site.register(AssignmentStatistics)
+admin.site.register(Feedback)
+admin.site.register(FeedbackJob)
+admin.site.register(GradingJob)
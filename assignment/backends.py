@@ -0,0 +1,577 @@
+from asgiref.sync import sync_to_async
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlparse
+from .batching import MicroBatcher
+from typing import Callable, List, Dict, Optional
+import asyncio, logging, requests, httpx, base64, time, json, os, pwd, signal, subprocess, sys, tempfile, threading, weakref
+
+logger = logging.getLogger(__name__)
+
+# Called with the index of a test case and its result as soon as the result is known
+ResultCallback = Callable[[int, dict], None]
+
+
+class SubmissionPendingError(Exception):
+    """Raised when Judge0 does not finish executing a batch before the polling deadline"""
+
+
+class ExecutionBackend:
+    """
+    Interface for services that run submitted code against test cases.
+
+    Every backend returns results in the same shape so that grading does not
+    depend on where the code was executed:
+    {"submission_result": [{"output": str, "time": str, "status": str}, ...]}
+
+    Backends report each test case result through `on_result` as soon as it is
+    known, so progress can be streamed before the whole batch has finished.
+    """
+    name = None
+
+    def execute(self, source_code: str, language_id: int, test_cases: List[Dict[str, str]], on_result: Optional[ResultCallback] = None) -> dict:
+        """Run source code against every test case and return the results in test case order"""
+        raise NotImplementedError
+
+    def get_available_languages(self) -> List[dict]:
+        """Get the languages this backend can execute"""
+        raise NotImplementedError
+
+    async def aexecute(self, source_code: str, language_id: int, test_cases: List[Dict[str, str]], on_result: Optional[ResultCallback] = None) -> dict:
+        """Async variant of execute, backends without an async client run execute on a thread"""
+        return await sync_to_async(self.execute, thread_sensitive=False)(source_code, language_id, test_cases, on_result)
+
+    async def aget_available_languages(self) -> List[dict]:
+        """Async variant of get_available_languages"""
+        return await sync_to_async(self.get_available_languages, thread_sensitive=False)()
+
+
+class Judge0Backend(ExecutionBackend):
+    """Separate client class to handle Judge0 API interactions"""
+    name = "judge0"
+
+    # Judge0 status ids for submissions that are "In Queue" or "Processing"
+    PENDING_STATUS_IDS = (1, 2)
+
+    def __init__(self):
+        self.base_url = settings.JUDGE0_BASE_URL.rstrip("/")
+        self.headers = {
+            "x-rapidapi-key": settings.RAPIDAPI_KEY,
+            "x-rapidapi-host": urlparse(self.base_url).netloc,
+            "Content-Type": "application/json"
+        }
+        self.timeout = (settings.JUDGE0_CONNECT_TIMEOUT, settings.JUDGE0_READ_TIMEOUT)
+        self.session = self._create_session()
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._executor = None
+        self._lock = threading.Lock()
+        self.batcher = None
+        if settings.JUDGE0_MICRO_BATCH_WINDOW > 0:
+            self.batcher = MicroBatcher(
+                self._post_batch,
+                window=settings.JUDGE0_MICRO_BATCH_WINDOW,
+                max_size=settings.JUDGE0_BATCH_SIZE,
+                workers=settings.JUDGE0_BATCH_WORKERS
+            )
+
+    def _create_session(self) -> requests.Session:
+        """Create a keep-alive session with a bounded connection pool and retry policy"""
+        retry = Retry(
+            total=settings.JUDGE0_MAX_RETRIES,
+            backoff_factor=settings.JUDGE0_RETRY_BACKOFF,
+            status_forcelist=(429, 500, 502, 503, 504),
+            # batch submissions are not idempotent, only connection errors are retried for POST
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=settings.JUDGE0_POOL_SIZE,
+            max_retries=retry
+        )
+        session = requests.Session()
+        session.headers.update(self.headers)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """
+        Keep-alive async client for the running event loop
+
+        Async connections are bound to the loop that opened them, so every loop
+        gets its own client with the same pool size and timeouts as the session
+        """
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=httpx.Timeout(settings.JUDGE0_READ_TIMEOUT, connect=settings.JUDGE0_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=settings.JUDGE0_POOL_SIZE,
+                    max_keepalive_connections=settings.JUDGE0_POOL_SIZE
+                ),
+                # only failed connection attempts are retried so batch submissions are never posted twice
+                transport=httpx.AsyncHTTPTransport(retries=settings.JUDGE0_MAX_RETRIES)
+            )
+            self._async_clients[loop] = client
+        return client
+
+    def connection_stats(self) -> Dict[str, int]:
+        """Report how many requests were served by reused pooled connections"""
+        stats = {"requests": 0, "connections": 0}
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                stats["requests"] += pool.num_requests
+                stats["connections"] += pool.num_connections
+        stats["reused"] = max(stats["requests"] - stats["connections"], 0)
+        return stats
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Lazily create the pool that dispatches batch chunks concurrently"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=settings.JUDGE0_BATCH_WORKERS,
+                        thread_name_prefix='checkmate-judge0'
+                    )
+        return self._executor
+
+    def execute(self, source_code: str, language_id: int, test_cases: List[Dict[str, str]], on_result: Optional[ResultCallback] = None) -> dict:
+        """
+        Submit test cases to Judge0 and wait for the results
+
+        Judge0 limits the number of submissions in a batch, so test cases are split
+        into chunks that are submitted and polled concurrently, then reassembled
+        in test case order
+        """
+        batch_size = settings.JUDGE0_BATCH_SIZE
+        chunks = [test_cases[start:start + batch_size] for start in range(0, len(test_cases), batch_size)]
+        if len(chunks) <= 1:
+            return self._execute_chunk(source_code, language_id, test_cases, on_result)
+
+        futures = [
+            self.executor.submit(self._execute_chunk, source_code, language_id, chunk, on_result, index * batch_size)
+            for index, chunk in enumerate(chunks)
+        ]
+        results = []
+        for future in futures:
+            results.extend(future.result()["submission_result"])
+        return {"submission_result": results}
+
+    def _execute_chunk(self, source_code: str, language_id: int, test_cases: List[Dict[str, str]], on_result: Optional[ResultCallback] = None, offset: int = 0) -> dict:
+        tokens = self.submit_code(source_code, language_id, test_cases)
+        if on_result is None:
+            return self.get_submission_result(tokens)
+        return self.get_submission_result(tokens, lambda index, result: on_result(offset + index, result))
+
+    async def aexecute(self, source_code: str, language_id: int, test_cases: List[Dict[str, str]], on_result: Optional[ResultCallback] = None) -> dict:
+        """
+        Submit test cases to Judge0 and await the results
+
+        Chunks are submitted and polled as coroutines on the event loop, so a
+        grading that is waiting on Judge0 does not hold a thread
+        """
+        batch_size = settings.JUDGE0_BATCH_SIZE
+        chunks = [test_cases[start:start + batch_size] for start in range(0, len(test_cases), batch_size)]
+        executed = await asyncio.gather(*(
+            self._aexecute_chunk(source_code, language_id, chunk, on_result, index * batch_size)
+            for index, chunk in enumerate(chunks)
+        ))
+        results = []
+        for chunk in executed:
+            results.extend(chunk["submission_result"])
+        return {"submission_result": results}
+
+    async def _aexecute_chunk(self, source_code: str, language_id: int, test_cases: List[Dict[str, str]], on_result: Optional[ResultCallback] = None, offset: int = 0) -> dict:
+        tokens = await self.asubmit_code(source_code, language_id, test_cases)
+        if on_result is None:
+            return await self.aget_submission_result(tokens)
+        return await self.aget_submission_result(tokens, lambda index, result: on_result(offset + index, result))
+
+    def submit_code(self, source_code: str, language_id: int, test_cases: List[Dict[str, any]], callback_url: str = None) -> dict:
+        """
+        Perform batch submission to Judge0
+
+        When micro-batching is enabled the submissions are coalesced with those of
+        other concurrent gradings into shared batch requests
+        """
+        submissions = self._build_submissions(source_code, language_id, test_cases, callback_url)
+        if self.batcher is not None:
+            return self.batcher.submit(submissions)
+        return self._post_batch(submissions)
+
+    async def asubmit_code(self, source_code: str, language_id: int, test_cases: List[Dict[str, any]]) -> dict:
+        """Async variant of submit_code"""
+        submissions = self._build_submissions(source_code, language_id, test_cases)
+        if self.batcher is not None:
+            return await self.batcher.asubmit(submissions)
+        return await self._apost_batch(submissions)
+
+    def _build_submissions(self, source_code: str, language_id: int, test_cases: List[Dict[str, any]], callback_url: str = None) -> List[dict]:
+        """Encode test cases as base64 Judge0 submissions"""
+        submissions = [
+            {
+                "source_code": base64.b64encode(source_code.encode()).decode(),
+                "language_id": language_id,
+                "stdin": base64.b64encode(tc["input"].encode()).decode(),
+                "expected_output": base64.b64encode(tc["output"].encode()).decode()
+            }
+            for tc in test_cases
+        ]
+        if callback_url:
+            for submission in submissions:
+                submission["callback_url"] = callback_url
+        return submissions
+
+    def _post_batch(self, submissions: List[dict]) -> List[dict]:
+        """Post a batch of base64 encoded submissions to Judge0 and return their tokens"""
+        try:
+            url = f"{self.base_url}/submissions/batch?base64_encoded=true"
+            response = self.session.post(url, json={"submissions": submissions}, timeout=self.timeout)
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error submitting code to Judge0: {str(e)}")
+            raise
+
+    async def _apost_batch(self, submissions: List[dict]) -> List[dict]:
+        """Async variant of _post_batch"""
+        try:
+            url = f"{self.base_url}/submissions/batch?base64_encoded=true"
+            response = await self.async_client.post(url, json={"submissions": submissions})
+            return response.json()
+        except httpx.HTTPError as e:
+            logger.error(f"Error submitting code to Judge0: {str(e)}")
+            raise
+
+    def get_submission_result(self, tokens: List[Dict[str, str]], on_result: Optional[ResultCallback] = None) -> dict:
+        """
+        Get batch submission result from judge0
+
+        Submissions that are still queued or processing are polled again with an
+        exponential backoff until every submission reaches a terminal status or
+        the polling deadline is exceeded
+        """
+        token_list = [t["token"] for t in tokens]
+        submissions = {}
+        pending = list(token_list)
+        delay = settings.JUDGE0_POLL_INITIAL_DELAY
+        deadline = time.monotonic() + settings.JUDGE0_POLL_TIMEOUT
+
+        try:
+            while True:
+                pending = self._record_poll(token_list, submissions, pending, self._fetch_submissions(pending), on_result)
+                if not pending:
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise SubmissionPendingError(f"{len(pending)} submissions still pending after {settings.JUDGE0_POLL_TIMEOUT}s")
+
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, settings.JUDGE0_POLL_MAX_DELAY)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error getting submission result: {str(e)}")
+            raise
+
+        cleaned_submissions = [self.clean_submission(submissions.get(token, {})) for token in token_list]
+        return {"submission_result": cleaned_submissions}
+
+    async def aget_submission_result(self, tokens: List[Dict[str, str]], on_result: Optional[ResultCallback] = None) -> dict:
+        """Async variant of get_submission_result, waiting between polls does not block the event loop"""
+        token_list = [t["token"] for t in tokens]
+        submissions = {}
+        pending = list(token_list)
+        delay = settings.JUDGE0_POLL_INITIAL_DELAY
+        deadline = time.monotonic() + settings.JUDGE0_POLL_TIMEOUT
+
+        try:
+            while True:
+                pending = self._record_poll(token_list, submissions, pending, await self._afetch_submissions(pending), on_result)
+                if not pending:
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise SubmissionPendingError(f"{len(pending)} submissions still pending after {settings.JUDGE0_POLL_TIMEOUT}s")
+
+                await asyncio.sleep(min(delay, remaining))
+                delay = min(delay * 2, settings.JUDGE0_POLL_MAX_DELAY)
+        except httpx.HTTPError as e:
+            logger.error(f"Error getting submission result: {str(e)}")
+            raise
+
+        cleaned_submissions = [self.clean_submission(submissions.get(token, {})) for token in token_list]
+        return {"submission_result": cleaned_submissions}
+
+    def _record_poll(self, token_list: List[str], submissions: Dict[str, dict], pending: List[str], polled: List[dict], on_result: Optional[ResultCallback]) -> List[str]:
+        """Store polled submissions, report the ones that finished and return the tokens still pending"""
+        for submission in polled:
+            submissions[submission.get("token")] = submission
+
+        # only re-query the tokens that have not finished executing
+        finished = [token for token in pending if not self._is_pending(submissions.get(token))]
+        if on_result is not None:
+            for token in finished:
+                on_result(token_list.index(token), self.clean_submission(submissions[token]))
+        return [token for token in pending if self._is_pending(submissions.get(token))]
+
+    def clean_submission(self, submission: dict, base64_encoded: bool = False) -> dict:
+        """Reduce a Judge0 submission to the fields used for grading"""
+        output = submission.get("stdout", "")
+        if base64_encoded and output:
+            output = base64.b64decode(output).decode(errors="replace")
+        return {
+            "output": output,
+            "time": f"{submission.get('time', '0')}s",
+            "status": (submission.get("status") or {}).get("description", "Unknown")
+        }
+
+    def submit_with_callback(self, source_code: str, language_id: int, test_cases: List[Dict[str, str]], callback_url: str) -> List[str]:
+        """
+        Submit test cases to Judge0 without waiting for the results
+
+        Judge0 reports the result of every submission to the callback url once it
+        finishes. Returns the submission tokens in test case order
+        """
+        batch_size = settings.JUDGE0_BATCH_SIZE
+        tokens = []
+        for start in range(0, len(test_cases), batch_size):
+            chunk = test_cases[start:start + batch_size]
+            tokens.extend(t["token"] for t in self.submit_code(source_code, language_id, chunk, callback_url))
+        return tokens
+
+    def _fetch_submissions(self, tokens: List[str]) -> List[dict]:
+        """Fetch the current state of a batch of submissions"""
+        querystring = {"tokens": ",".join(tokens), "fields": "token,stdout,time,status"}
+        url = f"{self.base_url}/submissions/batch"
+        response = self.session.get(url, params=querystring, timeout=self.timeout)
+        return [submission for submission in response.json().get("submissions", []) if submission]
+
+    async def _afetch_submissions(self, tokens: List[str]) -> List[dict]:
+        """Async variant of _fetch_submissions"""
+        querystring = {"tokens": ",".join(tokens), "fields": "token,stdout,time,status"}
+        url = f"{self.base_url}/submissions/batch"
+        response = await self.async_client.get(url, params=querystring)
+        return [submission for submission in response.json().get("submissions", []) if submission]
+
+    def _is_pending(self, submission: Optional[dict]) -> bool:
+        """Checks if a submission is yet to reach a terminal status"""
+        if not submission:
+            return True
+        return (submission.get("status") or {}).get("id") in self.PENDING_STATUS_IDS
+
+    def get_available_languages(self) -> List[dict]:
+        """Get available languages from Judge0"""
+        cached_languages = cache.get('languages')
+        if cached_languages:
+            return json.loads(cached_languages)
+
+        try:
+            url = f"{self.base_url}/languages"
+            response = self.session.get(url, timeout=self.timeout)
+            languages = response.json()
+
+            # store response in cache
+            cache.set('languages', json.dumps(languages), 3600)
+            return languages
+
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error getting available languages: {str(e)}")
+            raise
+
+    async def aget_available_languages(self) -> List[dict]:
+        """Async variant of get_available_languages"""
+        cached_languages = await cache.aget('languages')
+        if cached_languages:
+            return json.loads(cached_languages)
+
+        try:
+            url = f"{self.base_url}/languages"
+            response = await self.async_client.get(url)
+            languages = response.json()
+
+            # store response in cache
+            await cache.aset('languages', json.dumps(languages), 3600)
+            return languages
+
+        except httpx.HTTPError as e:
+            logger.error(f"Error getting available languages: {str(e)}")
+            raise
+
+
+# Applies resource limits to the current process and then replaces it with the
+# program being graded. Using a wrapper process instead of preexec_fn keeps the
+# limits safe to apply from the multi-threaded worker pool. When a runner user is
+# given the process first moves into an empty network namespace and drops to that
+# user, which requires the grading host to run as root.
+LIMITS_WRAPPER = """
+import ctypes, os, pwd, resource, signal, sys
+cpu, memory, processes, output, user = int(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4]), sys.argv[5]
+if user:
+    if ctypes.CDLL(None, use_errno=True).unshare(0x40000000) != 0:
+        sys.exit('Could not isolate the network: ' + os.strerror(ctypes.get_errno()))
+    account = pwd.getpwnam(user)
+    os.setgroups([])
+    os.setgid(account.pw_gid)
+    os.setuid(account.pw_uid)
+resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+resource.setrlimit(resource.RLIMIT_DATA, (memory, memory))
+resource.setrlimit(resource.RLIMIT_NPROC, (processes, processes))
+resource.setrlimit(resource.RLIMIT_FSIZE, (output, output))
+resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+# python ignores SIGXFSZ and the program would inherit that
+signal.signal(signal.SIGXFSZ, signal.SIG_DFL)
+os.execvp(sys.argv[6], sys.argv[6:])
+"""
+
+
+class LocalExecutionBackend(ExecutionBackend):
+    """
+    Runs submissions in resource limited subprocesses on the grading host.
+
+    Each test case is executed in its own process group with CPU time, memory,
+    process count, output size and wall clock limits, and the whole group is
+    killed once the program exits or times out. Output is written to files so
+    the output size limit applies to it and it is never buffered in memory. Compiled languages are compiled
+    once per submission. Only languages listed in LOCAL_RUNNER_LANGUAGES are
+    supported.
+
+    This is only a sandbox when LOCAL_RUNNER_USER is set. Programs then run as
+    that unprivileged user without network access, and the application tree
+    must not be readable by it. Without a runner user programs run as the
+    application user and can read its files and reach the network.
+    """
+    name = "local"
+
+    def __init__(self):
+        self.languages = settings.LOCAL_RUNNER_LANGUAGES
+        self.user = settings.LOCAL_RUNNER_USER
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Lazily create the pool that dispatches test case processes"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=settings.LOCAL_RUNNER_WORKERS,
+                        thread_name_prefix='checkmate-runner'
+                    )
+        return self._executor
+
+    def get_available_languages(self) -> List[dict]:
+        """Get the languages configured for local execution"""
+        return [{"id": language_id, "name": language["name"]} for language_id, language in self.languages.items()]
+
+    def execute(self, source_code: str, language_id: int, test_cases: List[Dict[str, str]], on_result: Optional[ResultCallback] = None) -> dict:
+        """Compile the source code if needed and run it against every test case"""
+        language = self.languages.get(language_id)
+        if language is None:
+            raise ValueError(f"Language {language_id} is not supported by the local runner")
+
+        with tempfile.TemporaryDirectory(prefix='checkmate-') as workdir:
+            with open(os.path.join(workdir, language["file"]), "w") as source_file:
+                source_file.write(source_code)
+            if self.user:
+                # the runner user only gets access to its own working directory
+                account = pwd.getpwnam(self.user)
+                for path in (workdir, os.path.join(workdir, language["file"])):
+                    os.chown(path, account.pw_uid, account.pw_gid)
+
+            if language.get("compile"):
+                compiled = self._run(language["compile"], "", workdir, settings.LOCAL_RUNNER_COMPILE_TIMEOUT)
+                if compiled["status"] != "Accepted":
+                    status = "Time Limit Exceeded" if compiled["status"] == "Time Limit Exceeded" else "Compilation Error"
+                    results = [
+                        {"output": compiled["output"], "time": compiled["time"], "status": status}
+                        for _ in test_cases
+                    ]
+                    if on_result is not None:
+                        for index, result in enumerate(results):
+                            on_result(index, result)
+                    return {"submission_result": results}
+
+            runs = [
+                self.executor.submit(self._run_test_case, language["run"], tc, workdir, index, on_result)
+                for index, tc in enumerate(test_cases)
+            ]
+            return {"submission_result": [run.result() for run in runs]}
+
+    def _run_test_case(self, command: List[str], test_case: Dict[str, str], workdir: str, index: int = 0, on_result: Optional[ResultCallback] = None) -> dict:
+        """Run a single test case and compare its output with the expected output"""
+        result = self._run(command, test_case["input"], workdir, settings.LOCAL_RUNNER_TIME_LIMIT)
+        if result["status"] == "Accepted" and result["output"].rstrip() != test_case["output"].rstrip():
+            result["status"] = "Wrong Answer"
+        if on_result is not None:
+            on_result(index, result)
+        return result
+
+    def _run(self, command: List[str], stdin: str, workdir: str, timeout: float) -> dict:
+        """Run a command inside the limits wrapper and map the outcome to a Judge0 style status"""
+        wrapped = [
+            sys.executable, "-c", LIMITS_WRAPPER,
+            str(int(timeout) + 1), str(settings.LOCAL_RUNNER_MEMORY_LIMIT),
+            str(settings.LOCAL_RUNNER_MAX_PROCESSES), str(settings.LOCAL_RUNNER_OUTPUT_LIMIT), self.user, *command
+        ]
+        limit = settings.LOCAL_RUNNER_OUTPUT_LIMIT
+        with tempfile.TemporaryFile(dir=workdir) as stdout, tempfile.TemporaryFile(dir=workdir) as stderr:
+            started = time.monotonic()
+            process = subprocess.Popen(
+                wrapped,
+                stdin=subprocess.PIPE,
+                stdout=stdout,
+                stderr=stderr,
+                cwd=workdir,
+                env={"PATH": os.environ.get("PATH", ""), "HOME": workdir},
+                start_new_session=True
+            )
+            try:
+                process.communicate(stdin.encode(), timeout=timeout)
+            except subprocess.TimeoutExpired:
+                self._kill_group(process)
+                process.wait()
+                return {"output": "", "time": f"{timeout}s", "status": "Time Limit Exceeded"}
+            finally:
+                # children left behind by the program are killed with it
+                self._kill_group(process)
+            elapsed = f"{time.monotonic() - started:.3f}s"
+
+            exceeded = process.returncode != 0 and os.fstat(stdout.fileno()).st_size >= limit
+            stdout.seek(0)
+            stderr.seek(0)
+            out = stdout.read(limit).decode(errors="replace")
+            err = stderr.read(limit).decode(errors="replace")
+
+        if process.returncode == 0:
+            status = "Accepted"
+        elif process.returncode in (-9, -24):
+            # killed by SIGKILL/SIGXCPU once the CPU time limit was reached
+            status = "Time Limit Exceeded"
+        elif process.returncode == -25 or exceeded:
+            # the program wrote more than the output limit
+            status = "Runtime Error (SIGXFSZ)"
+        elif process.returncode == -11:
+            status = "Runtime Error (SIGSEGV)"
+        else:
+            status = "Runtime Error (NZEC)"
+
+        output = out if process.returncode == 0 else out or err
+        return {"output": output, "time": elapsed, "status": status}
+
+    def _kill_group(self, process: subprocess.Popen) -> None:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, List, Tuple
+import asyncio, logging, threading, time
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Coalesces submissions from concurrent callers into shared batch requests.
+
+    Callers hand over their submissions and block until tokens come back. A
+    background thread collects submissions for up to `window` seconds, or until
+    `max_size` submissions are waiting, then posts them as one batch and hands
+    each caller back the tokens for its own submissions in order.
+    """
+
+    def __init__(self, post_batch: Callable[[List[dict]], List[dict]], window: float, max_size: int, workers: int):
+        self.post_batch = post_batch
+        self.window = window
+        self.max_size = max_size
+        self.stats = {"batches": 0, "submissions": 0}
+        self._pending: List[Tuple[dict, Future]] = []
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='checkmate-batcher')
+        self._thread = None
+
+    def submit(self, submissions: List[dict]) -> List[dict]:
+        """Queue submissions for the next batch and wait for their tokens"""
+        return [future.result() for future in self._enqueue(submissions)]
+
+    async def asubmit(self, submissions: List[dict]) -> List[dict]:
+        """Queue submissions for the next batch and await their tokens without blocking the event loop"""
+        return await asyncio.gather(*(asyncio.wrap_future(future) for future in self._enqueue(submissions)))
+
+    def _enqueue(self, submissions: List[dict]) -> List[Future]:
+        futures = [Future() for _ in submissions]
+        with self._condition:
+            self._ensure_started()
+            self._pending.extend(zip(submissions, futures))
+            self._condition.notify()
+        return futures
+
+    def _ensure_started(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='checkmate-batcher-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+
+                # give other callers a short window to join the batch
+                deadline = time.monotonic() + self.window
+                while len(self._pending) < self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+                batch = self._pending[:self.max_size]
+                self._pending = self._pending[self.max_size:]
+
+            self._executor.submit(self._flush, batch)
+
+    def _flush(self, batch: List[Tuple[dict, Future]]) -> None:
+        try:
+            tokens = self.post_batch([submission for submission, _ in batch])
+        except Exception as e:
+            logger.error(f"Error posting batch of {len(batch)} submissions: {str(e)}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        with self._condition:
+            self.stats["batches"] += 1
+            self.stats["submissions"] += len(batch)
+
+        if not isinstance(tokens, list) or len(tokens) != len(batch):
+            error = ValueError(f"Unexpected batch response: {tokens}")
+            for _, future in batch:
+                future.set_exception(error)
+            return
+
+        for (_, future), token in zip(batch, tokens):
+            future.set_result(token)
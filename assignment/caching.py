@@ -0,0 +1,198 @@
+from django.conf import settings
+from django.core.cache import cache
+from typing import List, Dict, Optional
+import hashlib, json, logging, re
+
+logger = logging.getLogger(__name__)
+
+
+class GradingCache:
+    """
+    Content addressed cache of execution results.
+
+    Entries are keyed on the assignment, the language, a digest of the normalized
+    source code and a version of the assignment's test case set, so identical code
+    submitted by different students shares a result while edits to the test cases
+    never serve stale results. Only the raw execution results are cached, the
+    score is always recalculated for the submission being graded.
+
+    Results of individual test cases are also memoized on the code digest,
+    language, stdin and expected output, so when a test case set changes only
+    the new or edited test cases have to be executed again.
+    """
+
+    def normalize_code(self, code: str) -> str:
+        """Normalize line endings and trailing whitespace which never change program behaviour"""
+        lines = code.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+        return '\n'.join(line.rstrip() for line in lines).strip('\n')
+
+    def code_digest(self, code: str) -> str:
+        return hashlib.sha256(self.normalize_code(code).encode()).hexdigest()
+
+    def test_case_version(self, test_cases: List[Dict[str, str]]) -> str:
+        """Digest of the ordered test case set, changes whenever a test case is added, removed or edited"""
+        serialized = json.dumps([[tc['input'], tc['output']] for tc in test_cases])
+        return hashlib.sha256(serialized.encode()).hexdigest()[:16]
+
+    def make_key(self, assignment_id, language_id: int, code: str, test_cases: List[Dict[str, str]]) -> str:
+        return ':'.join([
+            'grading',
+            str(assignment_id),
+            str(language_id),
+            self.test_case_version(test_cases),
+            self.code_digest(code),
+        ])
+
+    def get(self, assignment, code: str, test_cases: List[Dict[str, str]]) -> Optional[dict]:
+        """Get cached execution results for code submitted to an assignment"""
+        cached_results = cache.get(self.make_key(assignment.id, assignment.language_id, code, test_cases))
+        if cached_results is None:
+            return None
+        return json.loads(cached_results)
+
+    def set(self, assignment, code: str, test_cases: List[Dict[str, str]], submission_results: dict) -> bool:
+        """
+        Cache execution results unless the entry exceeds the configured size limit
+
+        Results with a verdict that depends on load, like a time limit or an
+        executor error, are not cached so identical code is executed again
+        """
+        if not all(self.is_deterministic(result) for result in submission_results['submission_result']):
+            return False
+
+        serialized = json.dumps({'submission_result': submission_results['submission_result']})
+        if len(serialized) > settings.GRADING_CACHE_MAX_ENTRY_BYTES:
+            logger.info(f"Skipping grading cache for assignment {assignment.id}, entry is {len(serialized)} bytes")
+            return False
+
+        key = self.make_key(assignment.id, assignment.language_id, code, test_cases)
+        cache.set(key, serialized, settings.GRADING_CACHE_TTL)
+        return True
+
+    def _test_case_key(self, code_digest: str, language_id: int, test_case: Dict[str, str]) -> str:
+        test_case_digest = hashlib.sha256(f"{test_case['input']}\0{test_case['output']}".encode()).hexdigest()
+        return f'testcase_result:{language_id}:{code_digest}:{test_case_digest}'
+
+    def get_test_case_results(self, code: str, language_id: int, test_cases: List[Dict[str, str]]) -> List[Optional[dict]]:
+        """Get memoized results for each test case, None marks a test case that still has to be executed"""
+        code_digest = self.code_digest(code)
+        keys = [self._test_case_key(code_digest, language_id, tc) for tc in test_cases]
+        cached_results = cache.get_many(keys)
+        return [json.loads(cached_results[key]) if key in cached_results else None for key in keys]
+
+    def set_test_case_results(self, code: str, language_id: int, test_cases: List[Dict[str, str]], results: List[dict]) -> None:
+        """Memoize deterministic test case results, transient failures are always re-executed"""
+        code_digest = self.code_digest(code)
+        entries = {
+            self._test_case_key(code_digest, language_id, tc): json.dumps(result)
+            for tc, result in zip(test_cases, results)
+            if self.is_deterministic(result)
+        }
+        if entries:
+            cache.set_many(entries, settings.TEST_CASE_RESULT_CACHE_TTL)
+
+    def is_deterministic(self, result: dict) -> bool:
+        """Time limits and executor errors depend on load, only stable verdicts are memoized"""
+        status = result.get('status', '')
+        return status in ('Accepted', 'Wrong Answer', 'Compilation Error') or status.startswith('Runtime Error')
+
+grading_cache = GradingCache()
+
+
+class FeedbackCache:
+    """
+    Cache of AI feedback shared by structurally identical submissions.
+
+    Entries are keyed on the assignment, the language and a fingerprint of the
+    code that ignores whitespace within lines, comments and the names students
+    pick for their variables, so near-identical submissions to an assignment
+    reuse feedback instead of going to the model again. The model addresses the
+    student with a placeholder, which is kept in the cache and substituted for
+    the student being served.
+    """
+    STUDENT_NAME = '{student_name}'
+    # languages where # starts a comment, elsewhere it starts a preprocessor directive like #include
+    HASH_COMMENT_LANGUAGES = ('python', 'ruby', 'bash', 'perl')
+    TOKEN_PATTERN = r"""
+        (?P<comment>COMMENT)
+        |(?P<directive>DIRECTIVE)
+        |(?P<string>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')
+        |(?P<identifier>[A-Za-z_]\w*)
+        |(?P<newline>\s*\n[ \t]*)
+        |(?P<space>\s+)
+        |(?P<symbol>.)
+    """
+    C_STYLE_TOKENS = re.compile(
+        TOKEN_PATTERN.replace('COMMENT', r'//[^\n]*|/\*.*?\*/').replace('DIRECTIVE', r'\#[^\n]*'),
+        re.DOTALL | re.VERBOSE
+    )
+    HASH_COMMENT_TOKENS = re.compile(
+        TOKEN_PATTERN.replace('COMMENT', r'\#[^\n]*').replace('DIRECTIVE', r'(?!)'),
+        re.DOTALL | re.VERBOSE
+    )
+    KEYWORDS = frozenset("""
+        and as assert async await break case catch char class const continue def default del do double elif else
+        enum except extends false finally float for from function global if implements import in int interface
+        is lambda let long new none nonlocal not null or pass private protected public raise return self short
+        static string struct super switch this throw throws true try typeof var void while with yield
+    """.split())
+
+    def fingerprint(self, code: str, keep_indentation: bool = False, hash_comments: bool = False) -> str:
+        """
+        Digest of the structure of the code
+
+        Comments and whitespace are dropped, line breaks and indentation are only
+        kept for languages where they are significant. Comments start with # when
+        hash_comments is set and are C style otherwise, preprocessor directives
+        are then kept verbatim. Identifiers are renamed in order of
+        appearance unless they are keywords, called or accessed as attributes, so
+        calls to different functions never share a fingerprint.
+        """
+        tokens = []
+        pattern = self.HASH_COMMENT_TOKENS if hash_comments else self.C_STYLE_TOKENS
+        matches = list(pattern.finditer(code.replace('\r\n', '\n').replace('\r', '\n')))
+        ignored = ('comment', 'space') if keep_indentation else ('comment', 'space', 'newline')
+        significant = [m for m in matches if m.lastgroup not in ignored]
+        names = {}
+        for index, match in enumerate(significant):
+            kind, value = match.lastgroup, match.group()
+            if kind == 'newline':
+                # comment and blank lines collapse into the following line
+                value = '\n' + value.rsplit('\n', 1)[1].expandtabs(4)
+                if tokens and tokens[-1].startswith('\n'):
+                    tokens[-1] = value
+                    continue
+            elif kind == 'directive':
+                value = ' '.join(value.split())
+            elif kind == 'identifier' and value.lower() not in self.KEYWORDS:
+                previous = significant[index - 1].group() if index else ''
+                following = significant[index + 1].group() if index + 1 < len(significant) else ''
+                if previous != '.' and following != '(':
+                    value = names.setdefault(value, f'v{len(names)}')
+            tokens.append(value)
+
+        return hashlib.sha256(' '.join(tokens).strip().encode()).hexdigest()
+
+    def make_key(self, assignment, code: str) -> str:
+        language = (assignment.programming_language or '').lower()
+        keep_indentation = 'python' in language
+        hash_comments = any(name in language for name in self.HASH_COMMENT_LANGUAGES)
+        fingerprint = self.fingerprint(code, keep_indentation, hash_comments)
+        return f'feedback_similar:{assignment.id}:{assignment.language_id}:{fingerprint}'
+
+    def get(self, assignment, code: str, student_name: str) -> Optional[str]:
+        """Get feedback generated for structurally identical code, addressed to the student"""
+        template = cache.get(self.make_key(assignment, code))
+        if template is None:
+            return None
+        return self.address(template, student_name)
+
+    def set(self, assignment, code: str, template: str) -> None:
+        """Cache feedback that still addresses the student with the placeholder"""
+        cache.set(self.make_key(assignment, code), template, settings.FEEDBACK_CACHE_TTL)
+
+    def address(self, template: str, student_name: str) -> str:
+        """Substitute the student's name for the placeholder"""
+        return template.replace(self.STUDENT_NAME, student_name)
+
+feedback_cache = FeedbackCache()
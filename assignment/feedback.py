@@ -0,0 +1,155 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from typing import Iterator, Optional
+from .models import Feedback, FeedbackJob, Submission
+from .tasks import feedback_queue
+from .caching import feedback_cache
+from .llm import llm_client
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class FeedbackService:
+    """
+    Generates AI feedback for submissions outside of the request cycle.
+
+    Only one generation runs per submission at a time, concurrent requests for
+    the same submission share the job that is already in flight instead of
+    paying for another call to the model. Feedback generated for structurally
+    identical code submitted to the same assignment is reused as well. The text
+    generated so far is published to the cache so jobs can be streamed.
+    """
+
+    def _feedback_key(self, submission_id) -> str:
+        return f'feedback_{submission_id}'
+
+    def _in_flight_key(self, submission_id) -> str:
+        return f'feedback_job_{submission_id}'
+
+    def _progress_key(self, job_id) -> str:
+        return f'feedback_progress_{job_id}'
+
+    def lookup(self, submission_id) -> Optional[str]:
+        """
+        Get previously generated feedback for a submission
+
+        Feedback is read from the cache first and then from the database, so a
+        submission only ever goes to the model once unless a refresh is requested
+        """
+        content = cache.get(self._feedback_key(submission_id))
+        if content is not None:
+            return content
+
+        content = Feedback.objects.filter(submission_id=submission_id).values_list('content', flat=True).first()
+        if content is not None:
+            cache.set(self._feedback_key(submission_id), content, 1800)
+        return content
+
+    def reuse_similar(self, submission: Submission, student) -> Optional[str]:
+        """Store feedback generated for structurally identical code as the feedback for a submission"""
+        content = feedback_cache.get(submission.assignment, submission.code, student.first_name)
+        if content is None:
+            return None
+
+        Feedback.objects.create(submission=submission, content=content)
+        cache.set(self._feedback_key(submission.id), content, 1800)
+        return content
+
+    def create_job(self, submission: Submission, student) -> FeedbackJob:
+        """Create a feedback job for a submission, or join the one already in flight"""
+        job = FeedbackJob.objects.create(submission=submission, student=student)
+
+        key = self._in_flight_key(submission.id)
+        if not cache.add(key, job.id, settings.FEEDBACK_JOB_TIMEOUT):
+            in_flight = FeedbackJob.objects.filter(pk=cache.get(key), submission=submission).first()
+            if in_flight is not None:
+                job.delete()
+                return in_flight
+            # the job holding the key is gone, take over the key
+            cache.set(key, job.id, settings.FEEDBACK_JOB_TIMEOUT)
+
+        # only start generating once the job is visible to the worker's connection
+        transaction.on_commit(lambda: feedback_queue.enqueue(self.generate, job.id))
+        return job
+
+    def build_prompt(self, submission: Submission) -> str:
+        """
+        Prompt for feedback on a submission
+
+        The model is not given the student's name, it writes a placeholder that is
+        substituted when the feedback is stored, so the generated text can be
+        shared with structurally identical submissions
+        """
+        assignment = submission.assignment
+        return f"""
+        Role: Programming Assistant providing constructive student code feedback
+
+        Key Objectives:
+        - Evaluate code correctness without giving direct solutions
+        - Assess code style and best practices
+        - Provide actionable improvement suggestions
+        - Offer positive reinforcement
+
+        Feedback Principles:
+        - Constructive and encouraging tone
+        - Preserve student's problem-solving ownership
+        - Keep feedback concise, focused and very short
+        - Address the student as {feedback_cache.STUDENT_NAME}, written exactly like that including the braces
+
+        Assignment Description: {assignment.description}
+        Programming Language: {assignment.programming_language}
+        Student Code Submission: {submission.code}
+        """
+
+    def stream_content(self, prompt: str) -> Iterator[str]:
+        return llm_client.stream(prompt)
+
+    def get_progress(self, job_id) -> str:
+        """Get the text a running feedback job has generated so far, still addressed with the placeholder"""
+        return cache.get(self._progress_key(job_id), '')
+
+    def _remember(self, submission: Submission, template: str, content: str) -> None:
+        # cache feedback in redis for 30 minutes
+        cache.set(self._feedback_key(submission.id), content, 1800)
+        feedback_cache.set(submission.assignment, submission.code, template)
+
+    def generate(self, job_id) -> None:
+        """Run a pending feedback job against the model"""
+        job = FeedbackJob.objects.select_related('submission__assignment', 'student').get(pk=job_id)
+        job.status = FeedbackJob.Status.RUNNING
+        job.save(update_fields=['status', 'updated_at'])
+
+        submission = job.submission
+        try:
+            self._generate(job)
+        finally:
+            # the key is released once the feedback is cached so later requests are served from the cache
+            cache.delete_many([self._in_flight_key(submission.id), self._progress_key(job.id)])
+
+    def _generate(self, job: FeedbackJob) -> None:
+        submission = job.submission
+        chunks = []
+        try:
+            for text in self.stream_content(self.build_prompt(submission)):
+                chunks.append(text)
+                cache.set(self._progress_key(job.id), ''.join(chunks), settings.FEEDBACK_JOB_TIMEOUT)
+        except Exception as e:
+            logger.error(f"Feedback job {job.id} failed: {str(e)}")
+            job.status = FeedbackJob.Status.FAILED
+            job.error = 'CheckMate AI is unavailable right now'
+            job.save(update_fields=['status', 'error', 'updated_at'])
+            return
+
+        template = ''.join(chunks)
+        with transaction.atomic():
+            job.feedback = Feedback.objects.create(
+                submission=submission, content=feedback_cache.address(template, job.student.first_name)
+            )
+            job.status = FeedbackJob.Status.COMPLETED
+            job.save(update_fields=['feedback', 'status', 'updated_at'])
+
+        self._remember(submission, template, job.feedback.content)
+
+feedback_service = FeedbackService()
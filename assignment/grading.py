@@ -0,0 +1,325 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.crypto import salted_hmac, constant_time_compare
+from typing import List, Dict
+from .models import GradingJob, Submission
+from .service import code_execution_service
+from .caching import grading_cache
+from .resilience import ExecutorUnavailableError
+from .tasks import task_queue
+from datetime import timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class GradingService:
+    """Handles grading of submitted code outside of the request cycle"""
+
+    async def acreate_job(self, assignment, student, code: str) -> GradingJob:
+        """
+        Create a grading job for a submission
+
+        Code that has already been executed against the same test cases is graded
+        straight away from the cache. With GRADING_ON_EVENT_LOOP enabled anything
+        else is graded as a coroutine on the event loop, otherwise it is handed
+        over to the worker pool
+        """
+        job = await sync_to_async(self._start_job)(assignment, student, code)
+        if job.status != GradingJob.Status.PENDING:
+            return job
+
+        if settings.GRADING_ON_EVENT_LOOP:
+            await task_queue.spawn(self.agrade, job.id)
+        else:
+            await sync_to_async(task_queue.enqueue)(self.grade, job.id)
+        return job
+
+    def _start_job(self, assignment, student, code: str) -> GradingJob:
+        """Create a pending grading job, or a completed one when the results are cached"""
+        job = GradingJob.objects.create(assignment=assignment, student=student, code=code)
+
+        test_cases = self.get_test_cases(assignment)
+        cached_results = grading_cache.get(assignment, code, test_cases)
+        if cached_results is not None:
+            self.finalize(job, cached_results, len(test_cases))
+        return job
+
+    def get_test_cases(self, assignment) -> List[Dict[str, str]]:
+        """
+        Extract all the test cases created for the assignment and represent them
+        in an input-output format for easy validation by the code execution service
+        """
+        test_cases = assignment.test_cases.order_by('id').values('input', 'output')
+        return [{"input": tc["input"], "output": tc["output"]} for tc in test_cases]
+
+    def calculate_score(self, submission_results: dict, test_case_count: int, max_score: int) -> float:
+        """Calculate final grade by using the number of passed test cases"""
+        if not test_case_count:
+            return 0
+        accepted_count = 0
+        for result in submission_results["submission_result"]:
+            if result["status"] == "Accepted":
+                accepted_count += 1
+        return (accepted_count / test_case_count) * max_score
+
+    def grade(self, job_id) -> None:
+        """Run a pending grading job against the code execution service"""
+        # claim the job so a job that was queued again after a backlog is only graded once
+        claimed = GradingJob.objects.filter(pk=job_id, status=GradingJob.Status.PENDING).update(
+            status=GradingJob.Status.RUNNING, updated_at=timezone.now()
+        )
+        if not claimed:
+            logger.info(f"Grading job {job_id} was already picked up")
+            return
+        job = GradingJob.objects.select_related('assignment', 'student').get(pk=job_id)
+
+        assignment = job.assignment
+        test_cases = self.get_test_cases(assignment)
+
+        if code_execution_service.supports_callbacks(assignment.language_id):
+            self.submit_for_callback(job, test_cases)
+            return
+
+        try:
+            # run the code against every test case on the configured execution backend
+            submission_results = code_execution_service.execute(
+                job.code, assignment.language_id, test_cases,
+                on_result=lambda index, result: self.report_progress(job.id, index, result)
+            )
+        except Exception as e:
+            self.fail(job, e)
+            return
+
+        grading_cache.set(assignment, job.code, test_cases, submission_results)
+        self.finalize(job, submission_results, len(test_cases))
+
+    async def agrade(self, job_id) -> None:
+        """
+        Async variant of grade
+
+        The executor is awaited on the event loop, so a job waiting for its results
+        does not hold a worker thread. Database work still runs on a thread.
+        """
+        claimed = await GradingJob.objects.filter(pk=job_id, status=GradingJob.Status.PENDING).aupdate(
+            status=GradingJob.Status.RUNNING, updated_at=timezone.now()
+        )
+        if not claimed:
+            logger.info(f"Grading job {job_id} was already picked up")
+            return
+        job = await GradingJob.objects.select_related('assignment', 'student').aget(pk=job_id)
+
+        assignment = job.assignment
+        test_cases = await sync_to_async(self.get_test_cases)(assignment)
+
+        if code_execution_service.supports_callbacks(assignment.language_id):
+            await sync_to_async(self.submit_for_callback)(job, test_cases)
+            return
+
+        try:
+            submission_results = await code_execution_service.aexecute(
+                job.code, assignment.language_id, test_cases,
+                on_result=lambda index, result: self.report_progress(job.id, index, result)
+            )
+        except Exception as e:
+            await sync_to_async(self.fail)(job, e)
+            return
+
+        await sync_to_async(grading_cache.set)(assignment, job.code, test_cases, submission_results)
+        await sync_to_async(self.finalize)(job, submission_results, len(test_cases))
+
+    def recover_stale(self, job: GradingJob) -> GradingJob:
+        """
+        Recover a job that was lost by its worker
+
+        Jobs only live in the worker pool of the process that created them, so a
+        restart or deploy loses them. A pending job that has not been picked up
+        within GRADING_JOB_TIMEOUT seconds is queued again and a running job that
+        has not finished by then is failed so clients stop polling it. Callback
+        jobs are instead reconciled with the results stored by Judge0
+        """
+        if job.status not in (GradingJob.Status.PENDING, GradingJob.Status.RUNNING):
+            return job
+        if job.updated_at > timezone.now() - timedelta(seconds=settings.GRADING_JOB_TIMEOUT):
+            return job
+
+        # claim the job so only one poller recovers it
+        claimed = GradingJob.objects.filter(pk=job.pk, status=job.status, updated_at=job.updated_at).update(
+            updated_at=timezone.now()
+        )
+        if claimed:
+            if job.status == GradingJob.Status.PENDING:
+                logger.warning(f"Re-queueing stale grading job {job.id}")
+                task_queue.enqueue(self.grade, job.id)
+            elif job.tokens:
+                logger.warning(f"Reconciling stale callback job {job.id}")
+                task_queue.enqueue(self.reconcile_callbacks, job.id)
+            else:
+                self.fail(job, TimeoutError(f"Grading job {job.id} did not finish in time"))
+
+        job.refresh_from_db()
+        return job
+
+    def _progress_key(self, job_id, index: int) -> str:
+        return f'grading_progress_{job_id}_{index}'
+
+    def report_progress(self, job_id, index: int, result: dict) -> None:
+        """Publish the result of a single test case while the job is still running"""
+        cache.set(self._progress_key(job_id, index), result, settings.GRADING_PROGRESS_TTL)
+
+    def get_progress(self, job_id, test_case_count: int) -> Dict[int, dict]:
+        """Get the test case results published so far for a job, keyed by test case index"""
+        keys = {self._progress_key(job_id, index): index for index in range(test_case_count)}
+        return {keys[key]: result for key, result in cache.get_many(list(keys)).items()}
+
+    def fail(self, job: GradingJob, error: Exception) -> None:
+        logger.error(f"Grading job {job.id} failed: {str(error)}")
+        job.status = GradingJob.Status.FAILED
+        if isinstance(error, ExecutorUnavailableError):
+            job.error = f'Code execution is busy, please try again in {error.retry_after} seconds'
+        else:
+            job.error = 'Could not execute code, please try again'
+        job.save(update_fields=['status', 'error', 'updated_at'])
+
+    def get_callback_url(self, job: GradingJob) -> str:
+        """Callback url for a job, signed so that only Judge0 can report results for it"""
+        return f"{settings.JUDGE0_CALLBACK_URL.rstrip('/')}/{job.id}/{self.sign(job.id)}"
+
+    def sign(self, job_id) -> str:
+        return salted_hmac('judge0-callback', str(job_id)).hexdigest()
+
+    def submit_for_callback(self, job: GradingJob, test_cases: List[Dict[str, str]]) -> None:
+        """
+        Submit a job to Judge0 and let the callback endpoint finalize it
+
+        Results can arrive before the tokens are stored, so results are kept per
+        token and the job is finalized by whichever side completes the set last.
+        Memoized test cases get a placeholder token with their result filled in.
+        """
+        if not test_cases:
+            # there is nothing to call back for, the job would never complete
+            self.finalize(job, {'submission_result': []}, 0)
+            return
+
+        try:
+            results, tokens = code_execution_service.submit(
+                job.code, job.assignment.language_id, test_cases, self.get_callback_url(job)
+            )
+        except Exception as e:
+            self.fail(job, e)
+            return
+
+        memoized = {}
+        for index, result in enumerate(results):
+            if tokens[index] is None:
+                tokens[index] = f'memoized-{index}'
+                memoized[tokens[index]] = result
+
+        with transaction.atomic():
+            job = GradingJob.objects.select_for_update().select_related('assignment', 'student').get(pk=job.id)
+            job.tokens = tokens
+            job.results.update(memoized)
+            job.save(update_fields=['tokens', 'results', 'updated_at'])
+
+            # publish memoized results and any callbacks that arrived before the tokens were stored
+            for index, token in enumerate(job.tokens):
+                if token in job.results:
+                    self.report_progress(job.id, index, job.results[token])
+            self._finalize_if_complete(job)
+
+    def handle_callback(self, job_id, signature: str, payload: dict) -> bool:
+        """Store the result of a single Judge0 submission reported to the callback endpoint"""
+        if not constant_time_compare(signature, self.sign(job_id)):
+            return False
+
+        token = payload.get('token')
+        result = code_execution_service.backends['judge0'].clean_submission(payload, base64_encoded=True)
+        with transaction.atomic():
+            job = GradingJob.objects.select_for_update().select_related('assignment', 'student').get(pk=job_id)
+            if job.status != GradingJob.Status.RUNNING:
+                return True
+            job.results[token] = result
+            job.save(update_fields=['results', 'updated_at'])
+            if token in job.tokens:
+                self.report_progress(job.id, job.tokens.index(token), result)
+            self._finalize_if_complete(job)
+        return True
+
+    def reconcile_callbacks(self, job_id) -> None:
+        """
+        Fetch the results of a stale callback job that Judge0 never reported
+
+        The job is finalized from the fetched results, or failed when they could
+        not be fetched or never reached a terminal status
+        """
+        job = GradingJob.objects.get(pk=job_id)
+        missing = [token for token in job.tokens if token not in job.results]
+        backend = code_execution_service.backends['judge0']
+        fetched = {}
+        try:
+            for start in range(0, len(missing), settings.JUDGE0_BATCH_SIZE):
+                chunk = missing[start:start + settings.JUDGE0_BATCH_SIZE]
+                execution = backend.get_submission_result([{'token': token} for token in chunk])
+                fetched.update(zip(chunk, execution['submission_result']))
+        except Exception as e:
+            self.fail(job, e)
+            return
+
+        with transaction.atomic():
+            job = GradingJob.objects.select_for_update().select_related('assignment', 'student').get(pk=job_id)
+            if job.status != GradingJob.Status.RUNNING:
+                return
+            for token, result in fetched.items():
+                # results delivered by a late callback take precedence
+                job.results.setdefault(token, result)
+            job.save(update_fields=['results', 'updated_at'])
+            self._finalize_if_complete(job)
+            if job.status == GradingJob.Status.RUNNING:
+                self.fail(job, ValueError(f"Grading job {job.id} has results missing"))
+
+    def _finalize_if_complete(self, job: GradingJob) -> None:
+        """Finalize a callback job once every test case has a result, the job row must be locked"""
+        if not job.tokens or any(token not in job.results for token in job.tokens):
+            return
+
+        execution = {'submission_result': [job.results[token] for token in job.tokens]}
+        test_cases = self.get_test_cases(job.assignment)
+        if len(test_cases) == len(job.tokens):
+            code_execution_service.remember(job.code, job.assignment.language_id, test_cases, execution)
+            grading_cache.set(job.assignment, job.code, test_cases, execution)
+        self.finalize(job, execution, len(job.tokens))
+
+    def finalize(self, job: GradingJob, submission_results: dict, test_case_count: int) -> Submission:
+        """Score the execution results and store the submission for a grading job"""
+        assignment = job.assignment
+        score = self.calculate_score(submission_results, test_case_count, assignment.max_score)
+
+        # include score in the results
+        submission_results['score'] = score
+
+        # execution happens before this point, only the inserts and flag updates share a transaction
+        with transaction.atomic():
+            # lock the job so a job that was graded twice only stores one submission
+            current = GradingJob.objects.select_for_update().select_related('submission').get(pk=job.pk)
+            if current.status == GradingJob.Status.COMPLETED:
+                logger.warning(f"Grading job {job.id} is already completed, discarding its results")
+                return current.submission
+
+            submission = Submission.objects.create(
+                assignment=assignment,
+                student=job.student,
+                code=job.code,
+                score=score,
+                results=submission_results
+            )
+
+            job.submission = submission
+            job.status = GradingJob.Status.COMPLETED
+            job.save(update_fields=['submission', 'status', 'updated_at'])
+
+        return submission
+
+grading_service = GradingService()
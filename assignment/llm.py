@@ -0,0 +1,40 @@
+from django.conf import settings
+import google.generativeai as genai
+from typing import Iterator
+import threading
+
+
+class LLMClient:
+    """
+    Process-wide client for the Gemini model used to generate feedback.
+
+    The API key is configured and the model created once, on first use, and
+    shared by every thread so the underlying channel is reused across requests.
+    Every call is bounded by LLM_TIMEOUT seconds.
+    """
+
+    def __init__(self):
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self) -> genai.GenerativeModel:
+        """Lazily configure the client and create the model on first use"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    genai.configure(api_key=settings.GEMINI_API_KEY)
+                    self._model = genai.GenerativeModel(settings.LLM_MODEL)
+        return self._model
+
+    @property
+    def request_options(self) -> dict:
+        return {'timeout': settings.LLM_TIMEOUT}
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Generate a response for a prompt, yielding text as the model produces it"""
+        response = self.model.generate_content(prompt, stream=True, request_options=self.request_options)
+        for chunk in response:
+            yield chunk.text
+
+llm_client = LLMClient()
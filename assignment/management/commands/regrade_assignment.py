@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from assignment.models import Assignment
+from assignment.regrade import regrade_service, RegradeInProgressError
+
+
+class Command(BaseCommand):
+    help = 'Regrade every submission for an assignment against its current test cases'
+
+    def add_arguments(self, parser):
+        parser.add_argument('assignment_id', help='id of the assignment to regrade')
+
+    def handle(self, *args, **options):
+        assignment_id = options['assignment_id']
+        if not Assignment.objects.filter(pk=assignment_id).exists():
+            raise CommandError(f'Assignment {assignment_id} does not exist')
+
+        try:
+            regrade_service.acquire(assignment_id)
+        except RegradeInProgressError as e:
+            raise CommandError(str(e))
+
+        progress = regrade_service.regrade(assignment_id, on_progress=self.report)
+        self.stdout.write(self.style.SUCCESS(
+            f"Regraded {progress['updated']} of {progress['total']} submissions "
+            f"({progress['unique']} unique, {progress['failed']} failed)"
+        ))
+
+    def report(self, progress):
+        if progress['status'] == 'RUNNING':
+            self.stdout.write(f"Executed {progress['executed']}/{progress['unique']} unique submissions")
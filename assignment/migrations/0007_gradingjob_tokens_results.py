@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-17 20:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment', '0006_gradingjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gradingjob',
+            name='results',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='gradingjob',
+            name='tokens',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
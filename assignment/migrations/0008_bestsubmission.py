@@ -0,0 +1,55 @@
+# Generated by Django 5.1.2 on 2026-10-17 20:42
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_best_submissions(apps, schema_editor):
+    Submission = apps.get_model('assignment', 'Submission')
+    BestSubmission = apps.get_model('assignment', 'BestSubmission')
+
+    best = {}
+    rows = Submission.objects.order_by('submitted_at').values_list('id', 'assignment_id', 'student_id', 'score')
+    for submission_id, assignment_id, student_id, score in rows.iterator(chunk_size=2000):
+        # the latest submission wins ties, matching Submission.save
+        key = (assignment_id, student_id)
+        if key not in best or score >= best[key][1]:
+            best[key] = (submission_id, score)
+
+    BestSubmission.objects.bulk_create([
+        BestSubmission(assignment_id=assignment_id, student_id=student_id, submission_id=submission_id, score=score)
+        for (assignment_id, student_id), (submission_id, score) in best.items()
+    ], batch_size=2000)
+
+    best_ids = [submission_id for submission_id, _ in best.values()]
+    Submission.objects.filter(is_best=True).update(is_best=False)
+    for start in range(0, len(best_ids), 2000):
+        Submission.objects.filter(id__in=best_ids[start:start + 2000]).update(is_best=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment', '0007_gradingjob_tokens_results'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BestSubmission',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('score', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='best_submissions', to='assignment.assignment')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='best_of', to='assignment.submission')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('assignment', 'student'), name='unique_best_submission')],
+            },
+        ),
+        migrations.RunPython(populate_best_submissions, migrations.RunPython.noop),
+    ]
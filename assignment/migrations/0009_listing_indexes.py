@@ -0,0 +1,27 @@
+# Generated by Django 5.1.2 on 2026-10-17 20:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment', '0008_bestsubmission'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='submission',
+            name='assignment__student_59de3a_idx',
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['-generated_at'], name='assignment__generat_011750_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['student', 'assignment', '-submitted_at'], name='assignment__student_295cbf_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.1.2 on 2026-10-17 20:52
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+def backfill_statistics(apps, schema_editor):
+    """Build the statistics of every assignment that already has submissions"""
+    Assignment = apps.get_model('assignment', 'Assignment')
+    AssignmentStatistics = apps.get_model('assignment', 'AssignmentStatistics')
+    BestSubmission = apps.get_model('assignment', 'BestSubmission')
+    Submission = apps.get_model('assignment', 'Submission')
+    TestCase = apps.get_model('assignment', 'TestCase')
+
+    for assignment_id in Assignment.objects.filter(submission__isnull=False).distinct().values_list('id', flat=True):
+        stats = AssignmentStatistics(assignment_id=assignment_id)
+        test_case_ids = [
+            str(test_case_id)
+            for test_case_id in TestCase.objects.filter(assignment_id=assignment_id).order_by('id').values_list('id', flat=True)
+        ]
+        results = Submission.objects.filter(assignment_id=assignment_id).values_list('results', flat=True)
+        for submission_results in results.iterator(chunk_size=2000):
+            stats.attempt_count += 1
+            submission_result = (submission_results or {}).get('submission_result', [])
+            if len(submission_result) == len(test_case_ids):
+                for test_case_id, result in zip(test_case_ids, submission_result):
+                    stats.test_case_attempts[test_case_id] = stats.test_case_attempts.get(test_case_id, 0) + 1
+                    if result.get('status') == 'Accepted':
+                        stats.test_case_passes[test_case_id] = stats.test_case_passes.get(test_case_id, 0) + 1
+            for result in submission_result:
+                try:
+                    stats.runtime_total += float(str(result.get('time', '')).rstrip('s'))
+                    stats.runtime_count += 1
+                except ValueError:
+                    pass
+
+        for score in BestSubmission.objects.filter(assignment_id=assignment_id).values_list('score', flat=True):
+            key = str(float(score))
+            stats.student_count += 1
+            stats.best_scores[key] = stats.best_scores.get(key, 0) + 1
+        stats.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment', '0009_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssignmentStatistics',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('attempt_count', models.IntegerField(default=0)),
+                ('student_count', models.IntegerField(default=0)),
+                ('best_scores', models.JSONField(default=dict)),
+                ('test_case_attempts', models.JSONField(default=dict)),
+                ('test_case_passes', models.JSONField(default=dict)),
+                ('runtime_total', models.FloatField(default=0)),
+                ('runtime_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('assignment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='assignment.assignment')),
+            ],
+            options={
+                'verbose_name_plural': 'assignment statistics',
+            },
+        ),
+        migrations.RunPython(backfill_statistics, migrations.RunPython.noop),
+    ]
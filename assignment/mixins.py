@@ -0,0 +1,32 @@
+from typing import Dict, List
+
+
+class DeferredFieldsMixin:
+    """
+    Leaves large columns out of list endpoints unless the client asks for them.
+
+    `deferred_fields` maps serializer field names to the model fields backing
+    them. Those fields are dropped from the response and deferred in the query
+    unless they are named in the ?include= query parameter, e.g. ?include=code,results
+    """
+    deferred_fields: Dict[str, str] = {}
+
+    def get_included_fields(self) -> List[str]:
+        requested = self.request.query_params.get('include', '').split(',')
+        # fields picked explicitly with ?fields= are included as well
+        requested += [path.split('.')[0] for path in self.request.query_params.get('fields', '').split(',')]
+        return [name for name in requested if name in self.deferred_fields]
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        included = self.get_included_fields()
+        return queryset.defer(*[field for name, field in self.deferred_fields.items() if name not in included])
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        included = self.get_included_fields()
+        fields = getattr(serializer, 'child', serializer).fields
+        for name in self.deferred_fields:
+            if name not in included:
+                fields.pop(name, None)
+        return serializer
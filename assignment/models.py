@@ -3,7 +3,8 @@ from course_management.models import Course
 from account.models import CustomUser
 from django.db import transaction
 from django.core.validators import MaxValueValidator, MinValueValidator
-import uuid
+from typing import List, Optional, Tuple
+import statistics, uuid
 
 
 class Assignment(models.Model):
@@ -26,6 +27,13 @@ class Assignment(models.Model):
         ordering = ['created_at']
 
 
+class TestCaseManager(models.Manager):
+    def test_case_ids(self, assignment_id) -> List[str]:
+        """Ids of the test cases of an assignment in the order they are graded in"""
+        test_case_ids = self.filter(assignment_id=assignment_id).order_by('id').values_list('id', flat=True)
+        return [str(test_case_id) for test_case_id in test_case_ids]
+
+
 class TestCase(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='test_cases')
@@ -33,6 +41,8 @@ class TestCase(models.Model):
     output = models.CharField(max_length=100)
     is_hidden = models.BooleanField(default=False)
 
+    objects = TestCaseManager()
+
     def __str__(self):
         return f'{self.assignment.title} - {self.input}'
 
@@ -54,27 +64,229 @@ class Submission(models.Model):
         ordering = ['-submitted_at']
         indexes = [
             models.Index(fields=['assignment', 'student', 'is_best']),
-            models.Index(fields=['student', 'assignment'])
+            models.Index(fields=['student', 'assignment', '-submitted_at'])
         ]
     
     def save(self, *args, **kwargs):
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.is_best, replaced_score = BestSubmission.objects.record(self)
+            # the statistics row is shared by the whole assignment, so it is updated
+            # after the insert commits instead of being locked for its duration
+            transaction.on_commit(lambda: AssignmentStatistics.objects.record(self, replaced_score), robust=True)
+
+
+class BestSubmissionManager(models.Manager):
+    def record(self, submission: Submission) -> Tuple[bool, Optional[float]]:
+        """
+        Make a new submission the best of its student if it scores at least as
+        well as the current best. Returns whether it became the best and the
+        score of the best submission it replaced
+
+        Only the best submission row of the student is locked and at most the old
+        and new submission rows are updated, so the cost does not grow with the
+        number of attempts. Must be called inside a transaction.
+        """
+        best, created = self.select_for_update().get_or_create(
+            assignment_id=submission.assignment_id,
+            student_id=submission.student_id,
+            defaults={'submission': submission, 'score': submission.score}
+        )
+        replaced_score = None
+        if not created:
+            if submission.score < best.score:
+                return False, None
+            Submission.objects.filter(pk=best.submission_id).update(is_best=False)
+            replaced_score = best.score
+            best.submission = submission
+            best.score = submission.score
+            best.save(update_fields=['submission', 'score', 'updated_at'])
+
+        Submission.objects.filter(pk=submission.pk).update(is_best=True)
+        return True, replaced_score
+
+
+class BestSubmission(models.Model):
+    """The best scoring submission of a student for an assignment"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='best_submissions')
+    student = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    submission = models.OneToOneField(Submission, on_delete=models.CASCADE, related_name='best_of')
+    score = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = BestSubmissionManager()
+
+    def __str__(self):
+        return f'{self.assignment.title} - {self.student.email} ({self.score})'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['assignment', 'student'], name='unique_best_submission')
+        ]
+
+
+class AssignmentStatisticsManager(models.Manager):
+    def record(self, submission: Submission, replaced_score: Optional[float]) -> None:
+        """
+        Add a newly stored submission to the statistics of its assignment
+
+        `replaced_score` is the score of the best submission the new one replaced,
+        if any. Called once the submission has been committed, only the statistics
+        row is locked and only for this short update. An assignment without a row
+        gets one built from the stored submissions.
+        """
+        test_case_ids = TestCase.objects.test_case_ids(submission.assignment_id)
         with transaction.atomic():
-            previous_best_submission = Submission.objects.filter(
-                assignment=self.assignment,
-                student=self.student,
-                is_best=True
-            ).select_for_update().first()
+            stats, created = self.select_for_update().get_or_create(assignment_id=submission.assignment_id)
+            if created:
+                stats.rebuild()
+                return
+
+            stats.add_attempt(submission.results, test_case_ids)
+            if submission.is_best:
+                if replaced_score is None:
+                    stats.student_count += 1
+                else:
+                    stats.remove_best_score(replaced_score)
+                stats.add_best_score(submission.score)
+            stats.save()
+
+    def rebuild(self, assignment: Assignment) -> 'AssignmentStatistics':
+        """Recompute the statistics of an assignment from its stored submissions"""
+        with transaction.atomic():
+            stats, _ = self.select_for_update().get_or_create(assignment=assignment)
+            stats.rebuild()
+        return stats
+
+
+class AssignmentStatistics(models.Model):
+    """
+    Aggregates over the graded submissions of an assignment.
+
+    Counters are maintained incrementally as submissions are stored so that
+    reading them never scans submissions. Best scores are kept as a count per
+    distinct score, which is bounded by the number of test cases, so the mean,
+    median and distribution are exact. Test case counters are keyed by test case
+    id, results are matched to test cases in the order they were graded in.
+    """
+    HISTOGRAM_BUCKETS = 10
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    assignment = models.OneToOneField(Assignment, on_delete=models.CASCADE, related_name='statistics')
+    attempt_count = models.IntegerField(default=0)
+    student_count = models.IntegerField(default=0)
+    best_scores = models.JSONField(default=dict)
+    test_case_attempts = models.JSONField(default=dict)
+    test_case_passes = models.JSONField(default=dict)
+    runtime_total = models.FloatField(default=0)
+    runtime_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = AssignmentStatisticsManager()
+
+    def __str__(self):
+        return f'{self.assignment.title} statistics'
+
+    def add_attempt(self, results: dict, test_case_ids: List[str]) -> None:
+        """
+        Count a graded submission, `test_case_ids` are the ids of the assignment's
+        test cases in grading order. Results graded against a different set of test
+        cases cannot be matched and only count towards the attempts and runtime
+        """
+        self.attempt_count += 1
+        submission_result = (results or {}).get('submission_result', [])
+        matched = len(submission_result) == len(test_case_ids)
+        for test_case_id, result in zip(test_case_ids, submission_result):
+            if not matched:
+                break
+            self.test_case_attempts[test_case_id] = self.test_case_attempts.get(test_case_id, 0) + 1
+            if result.get('status') == 'Accepted':
+                self.test_case_passes[test_case_id] = self.test_case_passes.get(test_case_id, 0) + 1
+
+        for result in submission_result:
+            try:
+                self.runtime_total += float(str(result.get('time', '')).rstrip('s'))
+                self.runtime_count += 1
+            except ValueError:
+                # submissions that never ran, e.g. compilation errors, have no runtime
+                pass
 
-            if not previous_best_submission or self.score >= previous_best_submission.score:
-                Submission.objects.filter(
-                    student=self.student,
-                    assignment=self.assignment
-                ).update(is_best=False)
+    def add_best_score(self, score: float) -> None:
+        key = str(float(score))
+        self.best_scores[key] = self.best_scores.get(key, 0) + 1
 
-                self.is_best = True
-            else:
-                self.is_best = False
-        super().save(*args, **kwargs)
+    def remove_best_score(self, score: float) -> None:
+        key = str(float(score))
+        self.best_scores[key] = self.best_scores.get(key, 0) - 1
+        if self.best_scores[key] <= 0:
+            del self.best_scores[key]
+
+    def rebuild(self) -> None:
+        """Reset the counters and recompute them from the stored submissions"""
+        self.attempt_count = self.student_count = self.runtime_count = 0
+        self.runtime_total = 0
+        self.best_scores, self.test_case_attempts, self.test_case_passes = {}, {}, {}
+
+        test_case_ids = TestCase.objects.test_case_ids(self.assignment_id)
+        results = Submission.objects.filter(assignment_id=self.assignment_id).values_list('results', flat=True)
+        for submission_results in results.iterator(chunk_size=2000):
+            self.add_attempt(submission_results, test_case_ids)
+        for score in BestSubmission.objects.filter(assignment_id=self.assignment_id).values_list('score', flat=True):
+            self.student_count += 1
+            self.add_best_score(score)
+        self.save()
+
+    def _scores(self):
+        return sorted((float(score), count) for score, count in self.best_scores.items())
+
+    @property
+    def mean_score(self) -> Optional[float]:
+        if not self.student_count:
+            return None
+        return sum(score * count for score, count in self._scores()) / self.student_count
+
+    @property
+    def median_score(self) -> Optional[float]:
+        if not self.student_count:
+            return None
+        return statistics.median(score for score, count in self._scores() for _ in range(count))
+
+    @property
+    def score_distribution(self) -> List[dict]:
+        """Number of students whose best score falls in each tenth of the maximum score"""
+        max_score = self.assignment.max_score
+        width = max_score / self.HISTOGRAM_BUCKETS
+        buckets = [
+            {'min': round(index * width, 2), 'max': round((index + 1) * width, 2), 'count': 0}
+            for index in range(self.HISTOGRAM_BUCKETS)
+        ]
+        for score, count in self._scores():
+            index = min(int(score / max_score * self.HISTOGRAM_BUCKETS), self.HISTOGRAM_BUCKETS - 1)
+            buckets[max(index, 0)]['count'] += count
+        return buckets
+
+    @property
+    def test_cases(self) -> List[dict]:
+        return [
+            {
+                'test_case_id': test_case_id,
+                'attempts': attempts,
+                'passes': self.test_case_passes.get(test_case_id, 0),
+                'pass_rate': self.test_case_passes.get(test_case_id, 0) / attempts if attempts else None
+            }
+            for test_case_id, attempts in sorted(self.test_case_attempts.items())
+        ]
+
+    @property
+    def average_runtime(self) -> Optional[float]:
+        return self.runtime_total / self.runtime_count if self.runtime_count else None
+
+    class Meta:
+        verbose_name_plural = 'assignment statistics'
 
 
 class Feedback(models.Model):
@@ -86,3 +298,55 @@ class Feedback(models.Model):
 
     class Meta:
         ordering = ['-generated_at']
+        indexes = [
+            models.Index(fields=['-generated_at'])
+        ]
+
+
+class GradingJob(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        RUNNING = 'RUNNING', 'Running'
+        COMPLETED = 'COMPLETED', 'Completed'
+        FAILED = 'FAILED', 'Failed'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='grading_jobs')
+    student = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    code = models.TextField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    submission = models.OneToOneField(Submission, on_delete=models.SET_NULL, null=True, blank=True)
+    error = models.CharField(max_length=255, null=True, blank=True)
+    tokens = models.JSONField(default=list, blank=True)
+    results = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.assignment.title} - {self.student.email} ({self.status})'
+
+    class Meta:
+        ordering = ['-created_at']
+
+
+class FeedbackJob(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        RUNNING = 'RUNNING', 'Running'
+        COMPLETED = 'COMPLETED', 'Completed'
+        FAILED = 'FAILED', 'Failed'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='feedback_jobs')
+    student = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    feedback = models.OneToOneField(Feedback, on_delete=models.SET_NULL, null=True, blank=True)
+    error = models.CharField(max_length=255, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Feedback for {self.submission_id} ({self.status})'
+
+    class Meta:
+        ordering = ['-created_at']
@@ -0,0 +1,21 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class SubmissionCursorPagination(CursorPagination):
+    """
+    Pages through submissions newest first.
+
+    Cursors encode the position of the last row instead of an offset, so pages
+    stay cheap to query and stable while new submissions come in. Clients can
+    pick a page size up to LISTING_MAX_PAGE_SIZE with ?page_size=
+    """
+    ordering = '-submitted_at'
+    page_size = settings.LISTING_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.LISTING_MAX_PAGE_SIZE
+
+
+class FeedbackCursorPagination(SubmissionCursorPagination):
+    """Pages through feedback newest first"""
+    ordering = '-generated_at'
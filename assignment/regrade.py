@@ -0,0 +1,170 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from typing import Callable, Optional
+from .models import Assignment, AssignmentStatistics, BestSubmission, Submission
+from .service import code_execution_service
+from .caching import grading_cache
+from .grading import grading_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RegradeInProgressError(Exception):
+    """Raised when a regrade is requested for an assignment that is already being regraded"""
+
+
+class RegradeService:
+    """
+    Regrades every submission for an assignment against its current test cases.
+
+    Submissions are streamed from the database and grouped by the digest of their
+    normalized code so identical code is only executed once. Unique code is then
+    executed concurrently and the new scores, results and best submission flags
+    are written back with bulk updates.
+    """
+
+    def _progress_key(self, assignment_id) -> str:
+        return f'regrade_progress_{assignment_id}'
+
+    def _lock_key(self, assignment_id) -> str:
+        return f'regrade_lock_{assignment_id}'
+
+    def get_progress(self, assignment_id) -> Optional[dict]:
+        """Get the progress of the latest regrade of an assignment"""
+        return cache.get(self._progress_key(assignment_id))
+
+    def _set_progress(self, assignment_id, progress: dict) -> None:
+        cache.set(self._progress_key(assignment_id), progress, settings.REGRADE_PROGRESS_TTL)
+
+    def acquire(self, assignment_id) -> None:
+        """Make sure only one regrade of an assignment runs at a time"""
+        if not cache.add(self._lock_key(assignment_id), True, settings.REGRADE_LOCK_TIMEOUT):
+            raise RegradeInProgressError(f"Assignment {assignment_id} is already being regraded")
+        self._set_progress(assignment_id, {'status': 'PENDING'})
+
+    def release(self, assignment_id) -> None:
+        cache.delete(self._lock_key(assignment_id))
+
+    def regrade(self, assignment_id, on_progress: Optional[Callable[[dict], None]] = None) -> dict:
+        """Regrade an assignment, the caller must have acquired the regrade lock"""
+        try:
+            return self._regrade(assignment_id, on_progress)
+        except Exception as e:
+            logger.error(f"Regrade of assignment {assignment_id} failed: {str(e)}")
+            progress = {**(self.get_progress(assignment_id) or {}), 'status': 'FAILED'}
+            self._set_progress(assignment_id, progress)
+            raise
+        finally:
+            self.release(assignment_id)
+
+    def _regrade(self, assignment_id, on_progress: Optional[Callable[[dict], None]]) -> dict:
+        assignment = Assignment.objects.get(pk=assignment_id)
+        test_cases = grading_service.get_test_cases(assignment)
+
+        # group submissions by code so each distinct program is only executed once
+        groups = {}
+        total = 0
+        submissions = Submission.objects.filter(assignment=assignment).only('id', 'code').order_by().iterator(chunk_size=settings.REGRADE_CHUNK_SIZE)
+        for submission in submissions:
+            digest = grading_cache.code_digest(submission.code)
+            group = groups.setdefault(digest, {'code': submission.code, 'submissions': []})
+            group['submissions'].append(submission.id)
+            total += 1
+
+        progress = {
+            'status': 'RUNNING',
+            'total': total,
+            'unique': len(groups),
+            'executed': 0,
+            'failed': 0,
+            'updated': 0,
+        }
+        self._report(assignment_id, progress, on_progress)
+
+        updates = []
+        with ThreadPoolExecutor(max_workers=settings.REGRADE_WORKERS, thread_name_prefix='checkmate-regrade') as executor:
+            futures = {
+                executor.submit(code_execution_service.execute, group['code'], assignment.language_id, test_cases): digest
+                for digest, group in groups.items()
+            }
+            for future in as_completed(futures):
+                group = groups[futures[future]]
+                try:
+                    execution = future.result()
+                except Exception as e:
+                    # submissions that could not be executed keep their previous score
+                    logger.error(f"Regrade execution failed for assignment {assignment_id}: {str(e)}")
+                    progress['failed'] += len(group['submissions'])
+                    self._report(assignment_id, progress, on_progress)
+                    continue
+
+                grading_cache.set(assignment, group['code'], test_cases, execution)
+                score = grading_service.calculate_score(execution, len(test_cases), assignment.max_score)
+                results = {'submission_result': execution['submission_result'], 'score': score}
+                updates.extend(Submission(id=submission_id, score=score, results=results) for submission_id in group['submissions'])
+
+                progress['executed'] += 1
+                self._report(assignment_id, progress, on_progress)
+
+        with transaction.atomic():
+            # submissions graded while the regrade is written wait on these locks in BestSubmission.record
+            locked = set(
+                BestSubmission.objects.select_for_update().filter(assignment=assignment).values_list('student_id', flat=True)
+            )
+            Submission.objects.bulk_update(updates, ['score', 'results'], batch_size=settings.REGRADE_CHUNK_SIZE)
+            self._update_best_flags(assignment, locked)
+            AssignmentStatistics.objects.rebuild(assignment)
+
+        progress['updated'] = len(updates)
+        progress['status'] = 'COMPLETED'
+        self._report(assignment_id, progress, on_progress)
+        return progress
+
+    def _update_best_flags(self, assignment: Assignment, locked: set) -> None:
+        """
+        Recompute the best submission of every student with bulk updates
+
+        Rows of students in `locked` are held by the caller and overwritten. Rows
+        for other students can only have been created by a submission graded since
+        the rows were locked, which is newer than anything read here, so they are
+        kept. The is_best flags are then derived from the table.
+        """
+        best = {}
+        rows = Submission.objects.filter(assignment=assignment).order_by('submitted_at').values_list(
+            'id', 'student_id', 'score'
+        ).iterator(chunk_size=settings.REGRADE_CHUNK_SIZE)
+        for submission_id, student_id, score in rows:
+            # the latest submission wins ties, matching Submission.save
+            if student_id not in best or score >= best[student_id][1]:
+                best[student_id] = (submission_id, score)
+
+        rows = {
+            student_id: BestSubmission(assignment=assignment, student_id=student_id, submission_id=submission_id, score=score)
+            for student_id, (submission_id, score) in best.items()
+        }
+        BestSubmission.objects.bulk_create(
+            [row for student_id, row in rows.items() if student_id in locked],
+            update_conflicts=True,
+            unique_fields=['assignment', 'student'],
+            update_fields=['submission', 'score', 'updated_at'],
+            batch_size=settings.REGRADE_CHUNK_SIZE
+        )
+        BestSubmission.objects.bulk_create(
+            [row for student_id, row in rows.items() if student_id not in locked],
+            ignore_conflicts=True,
+            batch_size=settings.REGRADE_CHUNK_SIZE
+        )
+
+        best_ids = BestSubmission.objects.filter(assignment=assignment).values('submission_id')
+        Submission.objects.filter(assignment=assignment, is_best=True).exclude(id__in=best_ids).update(is_best=False)
+        Submission.objects.filter(id__in=best_ids, is_best=False).update(is_best=True)
+
+    def _report(self, assignment_id, progress: dict, on_progress: Optional[Callable[[dict], None]]) -> None:
+        self._set_progress(assignment_id, dict(progress))
+        if on_progress:
+            on_progress(dict(progress))
+
+regrade_service = RegradeService()
@@ -0,0 +1,195 @@
+from asgiref.sync import sync_to_async
+from contextlib import asynccontextmanager, contextmanager
+from django.conf import settings
+from django.core.cache import cache
+import asyncio, logging, math, threading, time
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorUnavailableError(Exception):
+    """Raised when code execution is rejected to protect the executor or the API"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """
+    Bounds the number of in-flight executions.
+
+    A semaphore limits executions within the process and a counter in the cache
+    limits them across the cluster. Every acquire and release extends the
+    counter's expiry, so it only expires once no slot has changed hands for
+    EXECUTOR_CLUSTER_SLOT_TTL seconds, which reclaims slots leaked by crashed
+    processes without losing the count of slots still held.
+    """
+    CLUSTER_KEY = 'executor_in_flight'
+
+    def __init__(self):
+        self._semaphore = threading.BoundedSemaphore(settings.EXECUTOR_MAX_IN_FLIGHT)
+
+    @property
+    def retry_after(self) -> int:
+        """Seconds a rejected caller is asked to wait, in whole seconds for the Retry-After header"""
+        return math.ceil(settings.EXECUTOR_SLOT_TIMEOUT)
+
+    @contextmanager
+    def slot(self):
+        """Hold an execution slot for the duration of the block"""
+        deadline = time.monotonic() + settings.EXECUTOR_SLOT_TIMEOUT
+        if not self._semaphore.acquire(timeout=settings.EXECUTOR_SLOT_TIMEOUT):
+            raise ExecutorUnavailableError('Too many executions in progress', self.retry_after)
+
+        try:
+            self._acquire_cluster_slot(deadline)
+            try:
+                yield
+            finally:
+                self._release_cluster_slot()
+        finally:
+            self._semaphore.release()
+
+    @asynccontextmanager
+    async def aslot(self):
+        """Async variant of slot, waiting for a slot does not block the event loop"""
+        deadline = time.monotonic() + settings.EXECUTOR_SLOT_TIMEOUT
+        while not self._semaphore.acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                raise ExecutorUnavailableError('Too many executions in progress', self.retry_after)
+            await asyncio.sleep(0.1)
+
+        try:
+            await self._aacquire_cluster_slot(deadline)
+            try:
+                yield
+            finally:
+                await self._arelease_cluster_slot()
+        finally:
+            self._semaphore.release()
+
+    def _acquire_cluster_slot(self, deadline: float) -> None:
+        while True:
+            cache.add(self.CLUSTER_KEY, 0, settings.EXECUTOR_CLUSTER_SLOT_TTL)
+            try:
+                in_flight = cache.incr(self.CLUSTER_KEY)
+            except ValueError:
+                # the counter expired between add and incr
+                continue
+            cache.touch(self.CLUSTER_KEY, settings.EXECUTOR_CLUSTER_SLOT_TTL)
+            if in_flight <= settings.EXECUTOR_CLUSTER_MAX_IN_FLIGHT:
+                return
+
+            self._release_cluster_slot()
+            if time.monotonic() >= deadline:
+                raise ExecutorUnavailableError('Too many executions in progress', self.retry_after)
+            time.sleep(0.1)
+
+    def _release_cluster_slot(self) -> None:
+        try:
+            cache.decr(self.CLUSTER_KEY)
+        except ValueError:
+            return
+        cache.touch(self.CLUSTER_KEY, settings.EXECUTOR_CLUSTER_SLOT_TTL)
+
+    async def _aacquire_cluster_slot(self, deadline: float) -> None:
+        while True:
+            await cache.aadd(self.CLUSTER_KEY, 0, settings.EXECUTOR_CLUSTER_SLOT_TTL)
+            try:
+                in_flight = await cache.aincr(self.CLUSTER_KEY)
+            except ValueError:
+                # the counter expired between add and incr
+                continue
+            await cache.atouch(self.CLUSTER_KEY, settings.EXECUTOR_CLUSTER_SLOT_TTL)
+            if in_flight <= settings.EXECUTOR_CLUSTER_MAX_IN_FLIGHT:
+                return
+
+            await self._arelease_cluster_slot()
+            if time.monotonic() >= deadline:
+                raise ExecutorUnavailableError('Too many executions in progress', self.retry_after)
+            await asyncio.sleep(0.1)
+
+    async def _arelease_cluster_slot(self) -> None:
+        try:
+            await cache.adecr(self.CLUSTER_KEY)
+        except ValueError:
+            return
+        await cache.atouch(self.CLUSTER_KEY, settings.EXECUTOR_CLUSTER_SLOT_TTL)
+
+
+class CircuitBreaker:
+    """
+    Fails fast while the code executor is unhealthy.
+
+    Calls and failures are counted in a fixed window shared through the cache, a
+    call slower than EXECUTOR_BREAKER_SLOW_CALL counts as a failure. Only the
+    backend call is guarded, time spent waiting for an execution slot and
+    rejections by the concurrency limiter are not recorded. Once enough
+    calls have been made and the failure rate crosses the threshold the breaker
+    opens and every execution is rejected until the cooldown has passed.
+    """
+    OPEN_KEY = 'executor_breaker_open_until'
+    CALLS_KEY = 'executor_breaker_calls'
+    FAILURES_KEY = 'executor_breaker_failures'
+
+    def check(self) -> None:
+        """Raise if the breaker is open"""
+        open_until = cache.get(self.OPEN_KEY)
+        if open_until is None:
+            return
+        retry_after = math.ceil(open_until - time.time())
+        if retry_after > 0:
+            raise ExecutorUnavailableError('Code execution is temporarily unavailable', retry_after)
+
+    @contextmanager
+    def guard(self):
+        """Check the breaker and record the outcome and latency of the block"""
+        self.check()
+        started = time.monotonic()
+        try:
+            yield
+        except ExecutorUnavailableError:
+            # rejections by the limiter say nothing about the executor's health
+            raise
+        except Exception:
+            self.record(failed=True)
+            raise
+        self.record(failed=time.monotonic() - started > settings.EXECUTOR_BREAKER_SLOW_CALL)
+
+    @asynccontextmanager
+    async def aguard(self):
+        """Async variant of guard"""
+        await sync_to_async(self.check, thread_sensitive=False)()
+        started = time.monotonic()
+        try:
+            yield
+        except ExecutorUnavailableError:
+            raise
+        except Exception:
+            await sync_to_async(self.record, thread_sensitive=False)(failed=True)
+            raise
+        await sync_to_async(self.record, thread_sensitive=False)(failed=time.monotonic() - started > settings.EXECUTOR_BREAKER_SLOW_CALL)
+
+    def record(self, failed: bool) -> None:
+        calls = self._increment(self.CALLS_KEY)
+        failures = self._increment(self.FAILURES_KEY) if failed else cache.get(self.FAILURES_KEY, 0)
+
+        if calls >= settings.EXECUTOR_BREAKER_MIN_CALLS and failures / calls >= settings.EXECUTOR_BREAKER_FAILURE_RATE:
+            self.open()
+
+    def open(self) -> None:
+        logger.warning(f"Opening executor circuit breaker for {settings.EXECUTOR_BREAKER_COOLDOWN}s")
+        cache.set(self.OPEN_KEY, time.time() + settings.EXECUTOR_BREAKER_COOLDOWN, settings.EXECUTOR_BREAKER_COOLDOWN)
+        cache.delete_many([self.CALLS_KEY, self.FAILURES_KEY])
+
+    def _increment(self, key: str) -> int:
+        cache.add(key, 0, settings.EXECUTOR_BREAKER_WINDOW)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, settings.EXECUTOR_BREAKER_WINDOW)
+            return 1
+
+concurrency_limiter = ConcurrencyLimiter()
+circuit_breaker = CircuitBreaker()
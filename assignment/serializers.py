@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.utils import timezone
-from .models import Feedback, Assignment, TestCase, Submission, Feedback
+from .models import Feedback, Assignment, AssignmentStatistics, TestCase, Submission, Feedback, FeedbackJob, GradingJob
 from course_management.serializers import CourseSerializer
 from .service import code_execution_service
 from account.models import CustomUser
@@ -96,7 +96,7 @@ class AssignmentSubmissionSerializer(serializers.Serializer):
 class SubmissionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Submission
-        fields = ['id', 'code', 'score', 'is_best', 'submitted_at']
+        fields = ['id', 'code', 'results', 'score', 'is_best', 'submitted_at']
 
 
 class SubmissionDetailSerializer(serializers.ModelSerializer):
@@ -125,6 +125,19 @@ class AssignmentResultDataSerializer(serializers.ModelSerializer):
         fields = ['score', 'code', 'submitted_at', 'student']
 
 
+class AssignmentStatisticsSerializer(serializers.ModelSerializer):
+    mean_score = serializers.FloatField(allow_null=True)
+    median_score = serializers.FloatField(allow_null=True)
+    score_distribution = serializers.ListField(child=serializers.DictField())
+    test_cases = serializers.ListField(child=serializers.DictField())
+    average_runtime = serializers.FloatField(allow_null=True)
+
+    class Meta:
+        model = AssignmentStatistics
+        fields = ['attempt_count', 'student_count', 'mean_score', 'median_score',
+                  'score_distribution', 'test_cases', 'average_runtime', 'updated_at']
+
+
 class FeedbackRatingSerializer(serializers.ModelSerializer):
     rating = serializers.IntegerField(min_value=1, max_value=5)
 
@@ -153,4 +166,37 @@ class ProgrammingLanguageSerializer(serializers.Serializer):
     name = serializers.CharField()
 
     class Meta:
-        fields = ['id', 'name']
\ No newline at end of file
+        fields = ['id', 'name']
+
+
+class GradingJobSerializer(serializers.ModelSerializer):
+    result = serializers.SerializerMethodField()
+
+    class Meta:
+        model = GradingJob
+        fields = ['id', 'status', 'error', 'result', 'created_at', 'updated_at']
+
+    def get_result(self, obj):
+        if obj.status != GradingJob.Status.COMPLETED or not obj.submission:
+            return None
+        return {
+            'submission_id': str(obj.submission.id),
+            'score': obj.submission.score,
+            'submission_result': obj.submission.results.get('submission_result', [])
+        }
+
+
+class FeedbackJobSerializer(serializers.ModelSerializer):
+    feedback = serializers.SerializerMethodField()
+
+    class Meta:
+        model = FeedbackJob
+        fields = ['id', 'status', 'error', 'feedback', 'created_at', 'updated_at']
+
+    def get_feedback(self, obj):
+        if obj.status != FeedbackJob.Status.COMPLETED or not obj.feedback:
+            return None
+        return {
+            'id': str(obj.feedback.id),
+            'content': obj.feedback.content
+        }
@@ -1,81 +1,141 @@
+from asgiref.sync import sync_to_async
 from django.conf import settings
-import logging, requests, base64
-from typing import List, Dict
-from django.core.cache import cache
-import json
+from typing import List, Dict, Optional, Tuple
+from .backends import ExecutionBackend, Judge0Backend, LocalExecutionBackend, ResultCallback
+from .caching import grading_cache
+from .resilience import circuit_breaker, concurrency_limiter
+import logging, requests
 
 logger = logging.getLogger(__name__)
 
+
 class CodeExecutionService:
-    """Separate client class to handle Judge0 API interactions"""
-    BASE_URL = "https://judge0-ce.p.rapidapi.com"
+    """
+    Entry point for running submitted code.
+
+    Delegates execution to one of the configured backends. The default backend
+    is chosen per deployment with CODE_EXECUTION_BACKEND and can be overridden
+    for individual languages with CODE_EXECUTION_LANGUAGE_BACKENDS. Every call to a
+    backend holds an execution slot and goes through the circuit breaker.
+    """
+    BACKENDS = {
+        Judge0Backend.name: Judge0Backend,
+        LocalExecutionBackend.name: LocalExecutionBackend,
+    }
 
     def __init__(self):
-        self.headers = {
-            "x-rapidapi-key": settings.RAPIDAPI_KEY,
-            "x-rapidapi-host": "judge0-ce.p.rapidapi.com",
-            "Content-Type": "application/json"
-        }
-
-    def submit_code(self, source_code: str, language_id: int, test_cases: List[Dict[str, any]]) -> dict:
-        """Perform batch submission to Judge0"""
-        try:
-            url = f"{self.BASE_URL}/submissions/batch?base64_encoded=true"
-            payload = {
-                "submissions": [
-                    {
-                        "source_code": base64.b64encode(source_code.encode()).decode(),
-                        "language_id": language_id,
-                        "stdin": base64.b64encode(tc["input"].encode()).decode(),
-                        "expected_output": base64.b64encode(tc["output"].encode()).decode()
-                    }
-                    for tc in test_cases
-                ]
-            }
-
-            response = requests.post(url, headers=self.headers, json=payload)
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error submitting code to Judge0: {str(e)}")
-            raise
+        self.backends = {name: backend() for name, backend in self.BACKENDS.items()}
 
-    def get_submission_result(self, tokens: List[Dict[str, str]]) -> dict:
-        """Get batch submission result from judge0"""
-        try:
-            querystring = {"tokens": ",".join([t["token"] for t in tokens])}
-            url = f"{self.BASE_URL}/submissions/batch"
-            response = requests.get(url, headers=self.headers, params=querystring)
-            result = response.json()
-            cleaned_submissions = []
-            for submission in result.get("submissions", []):
-                cleaned_submissions.append({
-                    "output": submission.get("stdout", ""),
-                    "time": f"{submission.get('time', '0')}s",
-                    "status": submission.get("status", {}).get("description", "Unknown")
-                })
-            return {"submission_result": cleaned_submissions}
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error getting submission result: {str(e)}")
-            raise
-    
-    def get_available_languages(self) -> dict:
-        """Get available languages from Judge0"""
-        cached_languages = cache.get('languages')
-        if cached_languages:
-            return json.loads(cached_languages)
-    
-        try:
-            url = f"{self.BASE_URL}/languages"
-            response = requests.get(url, headers=self.headers)
-            languages = response.json()
+    def get_backend(self, language_id: int = None) -> ExecutionBackend:
+        """Get the backend responsible for executing a language"""
+        name = settings.CODE_EXECUTION_LANGUAGE_BACKENDS.get(language_id, settings.CODE_EXECUTION_BACKEND)
+        return self.backends[name]
 
-            # store response in cache
-            cache.set('languages', json.dumps(languages), 3600)
-            return languages
+    def execute(self, source_code: str, language_id: int, test_cases: List[Dict[str, str]], on_result: Optional[ResultCallback] = None) -> dict:
+        """
+        Run source code against the test cases on the backend configured for its language
 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error getting available languages: {str(e)}")
-            raise
+        Only test cases without a memoized result are sent to the backend, the
+        results are merged back in test case order
+        """
+        results = grading_cache.get_test_case_results(source_code, language_id, test_cases)
+        missing = [index for index, result in enumerate(results) if result is None]
+        if on_result is not None:
+            for index, result in enumerate(results):
+                if result is not None:
+                    on_result(index, result)
+        if not missing:
+            return {"submission_result": results}
+
+        backend_on_result = None
+        if on_result is not None:
+            backend_on_result = lambda index, result: on_result(missing[index], result)
+
+        uncached_test_cases = [test_cases[index] for index in missing]
+        with concurrency_limiter.slot(), circuit_breaker.guard():
+            executed = self.get_backend(language_id).execute(source_code, language_id, uncached_test_cases, backend_on_result)
+        grading_cache.set_test_case_results(source_code, language_id, uncached_test_cases, executed["submission_result"])
+
+        for index, result in zip(missing, executed["submission_result"]):
+            results[index] = result
+        return {"submission_result": results}
+
+    async def aexecute(self, source_code: str, language_id: int, test_cases: List[Dict[str, str]], on_result: Optional[ResultCallback] = None) -> dict:
+        """Async variant of execute for callers running on the event loop"""
+        results = await sync_to_async(grading_cache.get_test_case_results, thread_sensitive=False)(source_code, language_id, test_cases)
+        missing = [index for index, result in enumerate(results) if result is None]
+        if on_result is not None:
+            for index, result in enumerate(results):
+                if result is not None:
+                    on_result(index, result)
+        if not missing:
+            return {"submission_result": results}
+
+        backend_on_result = None
+        if on_result is not None:
+            backend_on_result = lambda index, result: on_result(missing[index], result)
+
+        uncached_test_cases = [test_cases[index] for index in missing]
+        async with concurrency_limiter.aslot(), circuit_breaker.aguard():
+            executed = await self.get_backend(language_id).aexecute(source_code, language_id, uncached_test_cases, backend_on_result)
+        await sync_to_async(grading_cache.set_test_case_results, thread_sensitive=False)(
+            source_code, language_id, uncached_test_cases, executed["submission_result"]
+        )
+
+        for index, result in zip(missing, executed["submission_result"]):
+            results[index] = result
+        return {"submission_result": results}
+
+    def supports_callbacks(self, language_id: int) -> bool:
+        """Checks if results for a language can be delivered through Judge0 callbacks"""
+        return bool(settings.JUDGE0_CALLBACK_URL) and isinstance(self.get_backend(language_id), Judge0Backend)
+
+    def submit(self, source_code: str, language_id: int, test_cases: List[Dict[str, str]], callback_url: str) -> Tuple[List[Optional[dict]], List[Optional[str]]]:
+        """
+        Submit source code for execution with results delivered to a callback url
+
+        Returns the memoized result or the Judge0 token of every test case, test
+        cases that are still running have no result yet
+        """
+        results = grading_cache.get_test_case_results(source_code, language_id, test_cases)
+        tokens = [None] * len(test_cases)
+        missing = [index for index, result in enumerate(results) if result is None]
+        if missing:
+            with concurrency_limiter.slot(), circuit_breaker.guard():
+                submitted = self.get_backend(language_id).submit_with_callback(
+                    source_code, language_id, [test_cases[index] for index in missing], callback_url
+                )
+            for index, token in zip(missing, submitted):
+                tokens[index] = token
+        return results, tokens
+
+    def remember(self, source_code: str, language_id: int, test_cases: List[Dict[str, str]], execution: dict) -> None:
+        """Memoize test case results that were delivered outside of execute"""
+        grading_cache.set_test_case_results(source_code, language_id, test_cases, execution["submission_result"])
+
+    def get_available_languages(self) -> List[dict]:
+        """Get available languages across every backend in use"""
+        names = dict.fromkeys([settings.CODE_EXECUTION_BACKEND, *settings.CODE_EXECUTION_LANGUAGE_BACKENDS.values()])
+        languages = {}
+        for name in names:
+            backend = self.backends[name]
+            for language in backend.get_available_languages():
+                # a language is only offered by the backend it is routed to
+                if self.get_backend(language.get('id')) is backend:
+                    languages[language.get('id')] = language
+        return list(languages.values())
+
+    async def aget_available_languages(self) -> List[dict]:
+        """Async variant of get_available_languages"""
+        names = dict.fromkeys([settings.CODE_EXECUTION_BACKEND, *settings.CODE_EXECUTION_LANGUAGE_BACKENDS.values()])
+        languages = {}
+        for name in names:
+            backend = self.backends[name]
+            for language in await backend.aget_available_languages():
+                # a language is only offered by the backend it is routed to
+                if self.get_backend(language.get('id')) is backend:
+                    languages[language.get('id')] = language
+        return list(languages.values())
 
     def validate_language(self, language_id) -> bool:
         """Checks if a specified language id is valid"""
@@ -88,4 +148,4 @@ class CodeExecutionService:
             logger.error(f"Error getting available languages: {str(e)}")
             raise
 
-code_execution_service = CodeExecutionService()
\ No newline at end of file
+code_execution_service = CodeExecutionService()
@@ -0,0 +1,125 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer
+from typing import AsyncIterator, Tuple
+from .models import FeedbackJob, GradingJob
+from .grading import grading_service
+from .feedback import feedback_service
+from .caching import feedback_cache
+import asyncio, json, time
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets views negotiate the text/event-stream media type sent by EventSource clients"""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return sse_event('error', data)
+
+
+def sse_event(event: str, data) -> str:
+    """Format a single server-sent event"""
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+async def grading_job_events(job_id, test_case_count: int) -> AsyncIterator[str]:
+    """
+    Stream the verdict of each test case of a grading job as it completes,
+    followed by the final score once the submission has been stored
+    """
+    sent = set()
+    deadline = time.monotonic() + settings.GRADING_STREAM_TIMEOUT
+
+    while True:
+        progress = await sync_to_async(grading_service.get_progress)(job_id, test_case_count)
+        for index in sorted(progress.keys() - sent):
+            sent.add(index)
+            yield sse_event('test_case', {'index': index, **progress[index]})
+
+        job = await GradingJob.objects.select_related('submission').aget(pk=job_id)
+        if job.status == GradingJob.Status.COMPLETED:
+            # results graded from the cache or finished between polls are sent from the submission
+            for index, result in enumerate(job.submission.results.get('submission_result', [])):
+                if index not in sent:
+                    yield sse_event('test_case', {'index': index, **result})
+            yield sse_event('result', {
+                'submission_id': str(job.submission.id),
+                'score': job.submission.score,
+            })
+            return
+
+        if job.status == GradingJob.Status.FAILED:
+            yield sse_event('error', {'message': job.error})
+            return
+
+        if time.monotonic() >= deadline:
+            yield sse_event('timeout', {'message': 'Grading is taking longer than expected, poll the job for the result'})
+            return
+
+        await asyncio.sleep(settings.GRADING_STREAM_INTERVAL)
+
+
+def _address_partial(text: str, student_name: str) -> Tuple[str, str]:
+    """
+    Substitute the student's name in streamed text, holding back a trailing piece
+    that may be the start of a placeholder split across chunks
+    """
+    text = feedback_cache.address(text, student_name)
+    placeholder = feedback_cache.STUDENT_NAME
+    for size in range(min(len(placeholder) - 1, len(text)), 0, -1):
+        if placeholder.startswith(text[-size:]):
+            return text[:-size], text[-size:]
+    return text, ''
+
+
+async def feedback_events(submission, student, refresh: bool) -> AsyncIterator[str]:
+    """
+    Stream AI feedback for a submission as the model generates it. Existing
+    feedback, or feedback for structurally identical code, is sent in one piece
+    unless a refresh is requested
+
+    The stream only reads the feedback job shared with every other request for the
+    submission, the job keeps running and stores the feedback if the client goes away
+    """
+    if not refresh:
+        feedback = await sync_to_async(feedback_service.lookup)(submission.id)
+        if feedback is None:
+            feedback = await sync_to_async(feedback_service.reuse_similar)(submission, student)
+        if feedback is not None:
+            yield sse_event('chunk', {'text': feedback})
+            yield sse_event('result', {'feedback': feedback})
+            return
+
+    job = await sync_to_async(feedback_service.create_job)(submission, student)
+    sent = ''
+    deadline = time.monotonic() + settings.FEEDBACK_STREAM_TIMEOUT
+
+    while True:
+        progress = await sync_to_async(feedback_service.get_progress)(job.id)
+        ready, _ = _address_partial(progress, student.first_name)
+        if len(ready) > len(sent):
+            yield sse_event('chunk', {'text': ready[len(sent):]})
+            sent = ready
+
+        job = await FeedbackJob.objects.select_related('feedback').aget(pk=job.id)
+        if job.status == FeedbackJob.Status.COMPLETED:
+            feedback = job.feedback
+            if len(feedback.content) > len(sent):
+                yield sse_event('chunk', {'text': feedback.content[len(sent):]})
+            yield sse_event('result', {'feedback_id': str(feedback.id), 'feedback': feedback.content})
+            return
+
+        if job.status == FeedbackJob.Status.FAILED:
+            yield sse_event('error', {'message': job.error})
+            return
+
+        if time.monotonic() >= deadline:
+            yield sse_event('timeout', {
+                'job_id': str(job.id),
+                'message': 'Feedback is taking longer than expected, poll the job for the result'
+            })
+            return
+
+        await asyncio.sleep(settings.FEEDBACK_STREAM_INTERVAL)
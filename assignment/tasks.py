@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor, Future
+from django.conf import settings
+from django.db import close_old_connections
+from typing import Awaitable, Callable
+import asyncio, logging, threading
+
+logger = logging.getLogger(__name__)
+
+
+class TaskQueue:
+    """
+    Process-wide pool of background workers for long running tasks.
+
+    Tasks are plain callables that are executed on a thread pool so that request
+    workers can return immediately. Each task gets a fresh database connection
+    which is released once the task finishes. Coroutine tasks can instead be
+    spawned on the running event loop. The pool is sized by the setting named
+    by workers_setting, so separate queues keep one kind of work from starving
+    another.
+    """
+
+    def __init__(self, workers_setting: str = 'GRADING_WORKERS', thread_name_prefix: str = 'checkmate-worker'):
+        self.workers_setting = workers_setting
+        self.thread_name_prefix = thread_name_prefix
+        self._executor = None
+        self._lock = threading.Lock()
+        self._background = set()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Lazily create the worker pool on first use"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=getattr(settings, self.workers_setting),
+                        thread_name_prefix=self.thread_name_prefix
+                    )
+        return self._executor
+
+    def enqueue(self, task: Callable, *args, **kwargs) -> Future:
+        """
+        Schedule a task on the worker pool.
+
+        When TASKS_ALWAYS_EAGER is enabled the task runs inline, which is useful
+        for tests and single process development setups.
+        """
+        if settings.TASKS_ALWAYS_EAGER:
+            future = Future()
+            try:
+                future.set_result(task(*args, **kwargs))
+            except Exception as e:
+                logger.error(f"Task {task.__name__} failed: {str(e)}")
+                future.set_exception(e)
+            return future
+
+        return self.executor.submit(self._run, task, *args, **kwargs)
+
+    async def spawn(self, task: Callable[..., Awaitable], *args, **kwargs) -> None:
+        """
+        Schedule a coroutine task on the running event loop.
+
+        The loop has to outlive the request, which is only the case when the
+        project is served through ASGI. When TASKS_ALWAYS_EAGER is enabled the
+        task is awaited inline.
+        """
+        if settings.TASKS_ALWAYS_EAGER:
+            await self._arun(task, *args, **kwargs)
+            return
+
+        background = asyncio.create_task(self._arun(task, *args, **kwargs))
+        # keep a reference so the task is not garbage collected before it finishes
+        self._background.add(background)
+        background.add_done_callback(self._background.discard)
+
+    async def _arun(self, task: Callable[..., Awaitable], *args, **kwargs) -> None:
+        try:
+            await task(*args, **kwargs)
+        except Exception as e:
+            logger.exception(f"Task {task.__name__} failed: {str(e)}")
+
+    def _run(self, task: Callable, *args, **kwargs):
+        close_old_connections()
+        try:
+            return task(*args, **kwargs)
+        except Exception as e:
+            logger.exception(f"Task {task.__name__} failed: {str(e)}")
+            raise
+        finally:
+            close_old_connections()
+
+task_queue = TaskQueue()
+# feedback generation gets its own workers so grading load does not delay it
+feedback_queue = TaskQueue('FEEDBACK_WORKERS', 'checkmate-feedback')
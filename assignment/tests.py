@@ -1,10 +1,30 @@
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.test import APITestCase
+from django.test import SimpleTestCase, override_settings
 from rest_framework import status
-from unittest.mock import Mock, patch
+from unittest import skipUnless
+from unittest.mock import AsyncMock, Mock, patch
 from django.contrib.auth import get_user_model
-from .models import Assignment, Course, Submission, TestCase
+from .models import Assignment, Course, Submission, BestSubmission, Feedback, FeedbackJob, TestCase, GradingJob
+from .backends import Judge0Backend, LocalExecutionBackend, SubmissionPendingError
+from .service import CodeExecutionService
+from .caching import feedback_cache, grading_cache
+from .batching import MicroBatcher
+from .llm import LLMClient
+from .tasks import TaskQueue
+from .grading import grading_service
+from .regrade import regrade_service
+from .feedback import feedback_service
+from .views import FeedbackGenerationView, FeedbackStreamView
+from .resilience import CircuitBreaker, ConcurrencyLimiter, ExecutorUnavailableError, circuit_breaker, concurrency_limiter
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from account.models import Student
+from asgiref.sync import async_to_sync
+from concurrent.futures import ThreadPoolExecutor
+import requests, shutil, subprocess, threading
 
 User = get_user_model()
 
@@ -191,38 +211,554 @@ class AssignmentViewsTest(APITestCase):
         self.assertEqual(response.data['title'], 'Test Assignment')
         self.assertEqual(response.data['programming_language'], 'Python (3.12.5)')
 
-    @patch('assignment.service.CodeExecutionService')
+    def test_assignment_detail_sparse_fieldset(self):
+        """Test that only the requested fields are serialized and loaded."""
+        self.client.force_authenticate(user=self.student)
+
+        url = reverse('assignment-detail', kwargs={'pk': self.assignment.id})
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, {'fields': 'id,title,course.course_code'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            'id': str(self.assignment.id),
+            'title': 'Test Assignment',
+            'course': {'course_code': 'CSC401'},
+        })
+        assignment_query = next(query['sql'] for query in context.captured_queries if 'FROM "assignment_assignment"' in query['sql'])
+        self.assertNotIn('"description"', assignment_query)
+        self.assertIn('"course_code"', assignment_query)
+        self.assertFalse(any('assignment_testcase' in query['sql'] for query in context.captured_queries))
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    @patch('assignment.grading.code_execution_service')
     def test_successful_submission(self, mock_code_execution_service):
         """Test successful code submission for an assignment."""
         self.client.force_authenticate(user=self.student)
         
         # Mock CodeExecutionService
-        mock_service_instance = Mock()
-        mock_service_instance.submit_code.return_value = ['token1']
-        mock_service_instance.get_submission_result.return_value = {
-            'submissions': [
-                {'status': 'Accepted'}
-            ]
+        mock_code_execution_service.supports_callbacks.return_value = False
+        mock_code_execution_service.execute.return_value = {
+            'submission_result': [
+                {'output': 'test_output', 'time': '0.01s', 'status': 'Accepted'}
+            ] * 6
         }
-        mock_code_execution_service.return_value = mock_service_instance
         
         submission_data = {
-            'code': self.submission.code
+            'code': 'def solution(): return "World"'
         }
         
         url = reverse('assignment-submit', kwargs={'pk': self.assignment.id})
-        response = self.client.post(url, submission_data, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, submission_data, format='json')
         
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn('score', response.data)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertIn('id', response.data)
         
-        # Verify submission was created
+        # Verify submission was created once grading finished
+        job = GradingJob.objects.get(pk=response.data['id'])
+        self.assertEqual(job.status, GradingJob.Status.COMPLETED)
         submission = Submission.objects.filter(
             assignment=self.assignment,
             student=self.student
         ).latest('submitted_at')
-        self.assertIsNotNone(submission)
+        self.assertEqual(job.submission, submission)
         self.assertEqual(submission.code, submission_data['code'])
+        self.assertEqual(submission.score, 100)
+
+    @override_settings(TASKS_ALWAYS_EAGER=True, GRADING_ON_EVENT_LOOP=True)
+    @patch('assignment.grading.code_execution_service')
+    def test_submission_graded_on_event_loop(self, mock_code_execution_service):
+        """Test that submissions can be graded as coroutines with the async executor client."""
+        self.client.force_authenticate(user=self.student)
+        mock_code_execution_service.supports_callbacks.return_value = False
+        mock_code_execution_service.aexecute = AsyncMock(return_value={
+            'submission_result': [
+                {'output': 'test_output', 'time': '0.01s', 'status': 'Accepted'}
+            ] * 6
+        })
+
+        url = reverse('assignment-submit', kwargs={'pk': self.assignment.id})
+        response = self.client.post(url, {'code': 'print("async")'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = GradingJob.objects.get(pk=response.data['id'])
+        self.assertEqual(job.status, GradingJob.Status.COMPLETED)
+        self.assertEqual(job.submission.score, 100)
+        mock_code_execution_service.aexecute.assert_awaited_once()
+        mock_code_execution_service.execute.assert_not_called()
+
+    def test_grading_job_status(self):
+        """Test polling a grading job returns its status and results once graded."""
+        self.client.force_authenticate(user=self.student)
+        job = GradingJob.objects.create(
+            assignment=self.assignment,
+            student=self.student,
+            code=self.submission.code
+        )
+
+        url = reverse('grading-job-detail', kwargs={'pk': job.id})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], GradingJob.Status.PENDING)
+        self.assertIsNone(response.data['result'])
+
+        job.submission = self.submission
+        job.status = GradingJob.Status.COMPLETED
+        job.save()
+
+        response = self.client.get(url)
+        self.assertEqual(response.data['status'], GradingJob.Status.COMPLETED)
+        self.assertEqual(response.data['result']['submission_id'], str(self.submission.id))
+        self.assertEqual(response.data['result']['score'], 90.0)
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    @patch('assignment.grading.code_execution_service')
+    def test_stale_grading_jobs_are_recovered(self, mock_code_execution_service):
+        """Test that jobs lost by a restarted worker are re-queued or failed when polled."""
+        self.client.force_authenticate(user=self.student)
+        mock_code_execution_service.supports_callbacks.return_value = False
+        mock_code_execution_service.execute.return_value = {
+            'submission_result': [{'output': 'test_output', 'time': '0.01s', 'status': 'Accepted'}] * 6
+        }
+        pending = GradingJob.objects.create(assignment=self.assignment, student=self.student, code='print(1)')
+        running = GradingJob.objects.create(
+            assignment=self.assignment, student=self.student, code='print(2)', status=GradingJob.Status.RUNNING
+        )
+
+        response = self.client.get(reverse('grading-job-detail', kwargs={'pk': pending.id}))
+        self.assertEqual(response.data['status'], GradingJob.Status.PENDING)
+
+        GradingJob.objects.update(updated_at=timezone.now() - timezone.timedelta(hours=1))
+        response = self.client.get(reverse('grading-job-detail', kwargs={'pk': pending.id}))
+        self.assertEqual(response.data['status'], GradingJob.Status.COMPLETED)
+        response = self.client.get(reverse('grading-job-detail', kwargs={'pk': running.id}))
+        self.assertEqual(response.data['status'], GradingJob.Status.FAILED)
+        mock_code_execution_service.execute.assert_called_once()
+
+        # the task queued before recovery still runs, but the job is only graded once
+        grading_service.grade(pending.id)
+        self.assertEqual(Submission.objects.filter(code='print(1)').count(), 1)
+        mock_code_execution_service.execute.assert_called_once()
+        with self.assertLogs('assignment.grading', 'WARNING'):
+            grading_service.finalize(pending, mock_code_execution_service.execute.return_value, 6)
+        self.assertEqual(Submission.objects.filter(code='print(1)').count(), 1)
+
+    @override_settings(GRADING_STREAM_INTERVAL=0)
+    def test_grading_job_stream(self):
+        """Test that test case verdicts are streamed as they complete, followed by the score."""
+        self.client.force_authenticate(user=self.student)
+        job = GradingJob.objects.create(
+            assignment=self.assignment,
+            student=self.student,
+            code=self.submission.code,
+            status=GradingJob.Status.RUNNING
+        )
+        grading_service.report_progress(job.id, 1, {'output': '', 'time': '0.1s', 'status': 'Wrong Answer'})
+
+        url = reverse('grading-job-stream', kwargs={'pk': job.id})
+        response = self.client.get(url, HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        self.submission.results = {'submission_result': [
+            {'output': 'test_output', 'time': '0.1s', 'status': 'Accepted'},
+            {'output': '', 'time': '0.1s', 'status': 'Wrong Answer'},
+        ]}
+        self.submission.save()
+        GradingJob.objects.filter(pk=job.id).update(status=GradingJob.Status.COMPLETED, submission=self.submission)
+
+        async def consume():
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        events = async_to_sync(consume)().decode().strip().split('\n\n')
+        self.assertEqual(len(events), 3)
+        self.assertIn('"index": 1', events[0])
+        self.assertIn('"index": 0', events[1])
+        self.assertTrue(events[2].startswith('event: result'))
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    @patch('assignment.grading.code_execution_service')
+    def test_failed_grading_job(self, mock_code_execution_service):
+        """Test that execution errors mark the grading job as failed."""
+        self.client.force_authenticate(user=self.student)
+        mock_code_execution_service.supports_callbacks.return_value = False
+        mock_code_execution_service.execute.side_effect = Exception('Judge0 unavailable')
+
+        url = reverse('assignment-submit', kwargs={'pk': self.assignment.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {'code': 'print(1)'}, format='json')
+
+        job = GradingJob.objects.get(pk=response.data['id'])
+        self.assertEqual(job.status, GradingJob.Status.FAILED)
+        self.assertIsNone(job.submission)
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    @patch.object(FeedbackGenerationView, 'throttle_classes', [])
+    @patch.object(feedback_service, 'stream_content', side_effect=lambda prompt: iter(['Nice ', 'work']))
+    def test_feedback_generated_in_background(self, mock_stream_content):
+        """Test that concurrent feedback requests share a single background generation."""
+        self.client.force_authenticate(user=self.student)
+        url = reverse('generate-feedback', kwargs={'pk': self.submission.id})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.client.post(url)
+            second = self.client.post(url)
+
+        self.assertEqual(first.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(second.data['id'], first.data['id'])
+        mock_stream_content.assert_called_once()
+        self.assertEqual(FeedbackJob.objects.count(), 1)
+
+        response = self.client.get(reverse('feedback-job-detail', kwargs={'pk': first.data['id']}))
+        self.assertEqual(response.data['status'], FeedbackJob.Status.COMPLETED)
+        self.assertEqual(response.data['feedback']['content'], 'Nice work')
+        self.assertEqual(Feedback.objects.filter(submission=self.submission).count(), 1)
+
+        # later requests are served from the cache
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['feedback'], 'Nice work')
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    @patch.object(FeedbackGenerationView, 'throttle_classes', [])
+    @patch.object(feedback_service, 'stream_content', side_effect=lambda prompt: iter(['Try a loop']))
+    def test_stored_feedback_is_reused(self, mock_stream_content):
+        """Test that feedback stored in the database is returned unless a refresh is requested."""
+        Feedback.objects.create(submission=self.submission, content='Good work')
+        self.client.force_authenticate(user=self.student)
+        url = reverse('generate-feedback', kwargs={'pk': self.submission.id})
+
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['feedback'], 'Good work')
+        mock_stream_content.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'{url}?refresh=true')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        mock_stream_content.assert_called_once()
+        self.assertEqual(self.client.post(url).data['feedback'], 'Try a loop')
+
+    @patch.object(FeedbackGenerationView, 'throttle_classes', [])
+    @patch.object(FeedbackStreamView, 'throttle_classes', [])
+    @patch.object(feedback_service, 'stream_content')
+    def test_feedback_only_for_own_submissions(self, mock_stream_content):
+        """Test that students cannot read or generate feedback for other students' submissions."""
+        Feedback.objects.create(submission=self.submission, content='Good work student')
+        other = User.objects.create_user(
+            first_name='other',
+            last_name='doe',
+            email='other@example.com',
+            password='testpass',
+            role='STUDENT'
+        )
+        self.client.force_authenticate(user=other)
+
+        for refresh in ('', '?refresh=true'):
+            response = self.client.post(reverse('generate-feedback', kwargs={'pk': self.submission.id}) + refresh)
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+            response = self.client.get(
+                reverse('feedback-stream', kwargs={'pk': self.submission.id}) + refresh, HTTP_ACCEPT='text/event-stream'
+            )
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(FeedbackJob.objects.exists())
+        mock_stream_content.assert_not_called()
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    @patch.object(FeedbackGenerationView, 'throttle_classes', [])
+    @patch.object(feedback_service, 'stream_content', side_effect=lambda prompt: iter(['Well done {student_name}, try a loop. May the tests pass']))
+    def test_feedback_reused_for_similar_code(self, mock_stream_content):
+        """Test that structurally identical submissions share feedback addressed to each student."""
+        other = User.objects.create_user(
+            first_name='other',
+            last_name='doe',
+            email='other@example.com',
+            password='testpass',
+            role='STUDENT'
+        )
+        submission = Submission.objects.create(
+            assignment=self.assignment, student=self.student, code='x = int(input())\nprint(x * 2)', score=50.0, results={}
+        )
+        similar = Submission.objects.create(
+            assignment=self.assignment, student=other, code='# double it\nn=int(input())\nprint(n*2)\n', score=50.0, results={}
+        )
+
+        self.student.first_name = 'May'
+        self.student.save()
+        self.client.force_authenticate(user=self.student)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('generate-feedback', kwargs={'pk': submission.id}))
+        self.assertEqual(Feedback.objects.get(submission=submission).content, 'Well done May, try a loop. May the tests pass')
+        self.assertNotIn('May', mock_stream_content.call_args.args[0])
+
+        self.client.force_authenticate(user=other)
+        response = self.client.post(reverse('generate-feedback', kwargs={'pk': similar.id}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['feedback'], 'Well done other, try a loop. May the tests pass')
+        self.assertTrue(Feedback.objects.filter(submission=similar).exists())
+        mock_stream_content.assert_called_once()
+
+    def consume_events(self, response):
+        async def consume():
+            return b''.join([chunk async for chunk in response.streaming_content])
+        return async_to_sync(consume)().decode().strip().split('\n\n')
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    @patch.object(FeedbackStreamView, 'throttle_classes', [])
+    @patch.object(transaction, 'on_commit', side_effect=lambda callback, **kwargs: callback())
+    @patch.object(feedback_service, 'stream_content', side_effect=lambda prompt: iter(['Nice work {stu', 'dent_name}', '!']))
+    def test_feedback_stream(self, mock_stream_content, mock_on_commit):
+        """Test that streamed feedback is generated by a feedback job and stored once complete."""
+        self.client.force_authenticate(user=self.student)
+
+        url = reverse('feedback-stream', kwargs={'pk': self.submission.id})
+        response = self.client.get(url, HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        events = self.consume_events(response)
+        self.assertEqual(len(events), 2)
+        self.assertIn('"text": "Nice work student!"', events[0])
+        self.assertTrue(events[1].startswith('event: result'))
+        self.assertEqual(FeedbackJob.objects.get().status, FeedbackJob.Status.COMPLETED)
+        self.assertEqual(Feedback.objects.get(submission=self.submission).content, 'Nice work student!')
+
+        # stored feedback is sent in one piece without going back to the model
+        events = self.consume_events(self.client.get(url, HTTP_ACCEPT='text/event-stream'))
+        self.assertEqual(len(events), 2)
+        mock_stream_content.assert_called_once()
+
+    @override_settings(FEEDBACK_STREAM_TIMEOUT=0)
+    @patch.object(FeedbackGenerationView, 'throttle_classes', [])
+    @patch.object(FeedbackStreamView, 'throttle_classes', [])
+    @patch.object(feedback_service, 'stream_content', side_effect=lambda prompt: iter(['Nice work {student_name}']))
+    def test_feedback_stream_joins_job_in_flight(self, mock_stream_content):
+        """Test that a stream reads the job already in flight, which finishes after the client goes away."""
+        self.client.force_authenticate(user=self.student)
+        job = self.client.post(reverse('generate-feedback', kwargs={'pk': self.submission.id}))
+        cache.set(f'feedback_progress_{job.data["id"]}', 'Nice work {stu')
+
+        url = reverse('feedback-stream', kwargs={'pk': self.submission.id})
+        events = self.consume_events(self.client.get(url, HTTP_ACCEPT='text/event-stream'))
+        self.assertEqual(len(events), 2)
+        self.assertIn('"text": "Nice work "', events[0])
+        self.assertTrue(events[1].startswith('event: timeout'))
+        self.assertIn(job.data['id'], events[1])
+        self.assertEqual(FeedbackJob.objects.count(), 1)
+        mock_stream_content.assert_not_called()
+
+        feedback_service.generate(job.data['id'])
+        events = self.consume_events(self.client.get(url, HTTP_ACCEPT='text/event-stream'))
+        self.assertIn('"text": "Nice work student"', events[0])
+        mock_stream_content.assert_called_once()
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    @patch.object(FeedbackGenerationView, 'throttle_classes', [])
+    @patch.object(feedback_service, 'stream_content', side_effect=Exception('Gemini unavailable'))
+    def test_failed_feedback_job(self, mock_stream_content):
+        """Test that a failed generation is reported and does not block later requests."""
+        self.client.force_authenticate(user=self.student)
+        url = reverse('generate-feedback', kwargs={'pk': self.submission.id})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.client.post(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            second = self.client.post(url)
+
+        self.assertEqual(FeedbackJob.objects.get(pk=first.data['id']).status, FeedbackJob.Status.FAILED)
+        self.assertNotEqual(second.data['id'], first.data['id'])
+        self.assertEqual(mock_stream_content.call_count, 2)
+
+    def test_finalize_rolls_back_submission_on_error(self):
+        """Test that the submission insert and best flag update are committed together."""
+        job = GradingJob.objects.create(assignment=self.assignment, student=self.student, code='print(1)')
+        results = {'submission_result': [{'output': 'test_output', 'time': '0.01s', 'status': 'Accepted'}] * 6}
+
+        with patch.object(GradingJob, 'save', side_effect=Exception('Database unavailable')):
+            with self.assertRaises(Exception):
+                grading_service.finalize(job, results, 6)
+
+        self.assertEqual(Submission.objects.filter(assignment=self.assignment, student=self.student).count(), 1)
+        self.submission.refresh_from_db()
+        self.assertTrue(self.submission.is_best)
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    @patch('assignment.grading.code_execution_service')
+    def test_identical_submission_uses_cached_results(self, mock_code_execution_service):
+        """Test that resubmitting identical code is graded from the cache."""
+        self.client.force_authenticate(user=self.student)
+        mock_code_execution_service.supports_callbacks.return_value = False
+        mock_code_execution_service.execute.return_value = {
+            'submission_result': [{'output': 'test_output', 'time': '0.01s', 'status': 'Accepted'}] * 6
+        }
+
+        url = reverse('assignment-submit', kwargs={'pk': self.assignment.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.client.post(url, {'code': 'print("cached")'}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            second = self.client.post(url, {'code': 'print("cached")   \r\n'}, format='json')
+
+        self.assertEqual(first.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data['result']['score'], 100)
+        first_submission = GradingJob.objects.get(pk=first.data['id']).submission
+        self.assertNotEqual(second.data['result']['submission_id'], str(first_submission.id))
+        self.assertEqual(mock_code_execution_service.execute.call_count, 1)
+
+        # editing the test cases must not serve the stale result
+        TestCase.objects.filter(pk=self.test_case.pk).update(output='changed_output')
+        with self.captureOnCommitCallbacks(execute=True):
+            third = self.client.post(url, {'code': 'print("cached")'}, format='json')
+
+        self.assertEqual(third.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(mock_code_execution_service.execute.call_count, 2)
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    @patch('assignment.regrade.code_execution_service')
+    def test_regrade_assignment(self, mock_code_execution_service):
+        """Test that a lecturer can regrade every submission for an assignment."""
+        self.client.force_authenticate(user=self.lecturer)
+        retry = Submission.objects.create(
+            assignment=self.assignment,
+            student=self.student,
+            code='print("retry")',
+            score=50.0,
+            results={'submission_result': []}
+        )
+        Submission.objects.create(
+            assignment=self.assignment,
+            student=self.student,
+            code=self.submission.code,
+            score=10.0,
+            results={'submission_result': []}
+        )
+
+        def execute(code, language_id, test_cases):
+            status_ = 'Accepted' if code == 'print("retry")' else 'Wrong Answer'
+            return {'submission_result': [{'output': '', 'time': '0.01s', 'status': status_}] * len(test_cases)}
+        mock_code_execution_service.execute.side_effect = execute
+
+        url = reverse('regrade-assignment', kwargs={'pk': self.assignment.id})
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        # identical code is only executed once
+        self.assertEqual(mock_code_execution_service.execute.call_count, 2)
+        self.assertEqual(
+            list(Submission.objects.filter(assignment=self.assignment, is_best=True).values_list('id', flat=True)),
+            [retry.id]
+        )
+        self.assertEqual(Submission.objects.get(pk=retry.id).score, 100)
+        self.assertEqual(Submission.objects.get(pk=self.submission.id).score, 0)
+        best = BestSubmission.objects.get(assignment=self.assignment, student=self.student)
+        self.assertEqual((best.submission_id, best.score), (retry.id, 100))
+
+        response = self.client.get(url)
+        self.assertEqual(response.data['status'], 'COMPLETED')
+        self.assertEqual(response.data['total'], 3)
+        self.assertEqual(response.data['unique'], 2)
+        self.assertEqual(response.data['updated'], 3)
+
+    def test_regrade_keeps_best_submissions_recorded_since_locking(self):
+        """Test that best submissions recorded after the regrade locked its rows are not overwritten."""
+        BestSubmission.objects.filter(assignment=self.assignment).delete()
+        Submission.objects.filter(pk=self.submission.pk).update(is_best=False)
+        newer = Submission.objects.create(
+            assignment=self.assignment,
+            student=self.student,
+            code='print("newer")',
+            score=20.0,
+            results={'submission_result': []}
+        )
+
+        # the student had no locked row, so the row recorded for the newer submission wins
+        regrade_service._update_best_flags(self.assignment, locked=set())
+
+        best = BestSubmission.objects.get(assignment=self.assignment, student=self.student)
+        self.assertEqual(best.submission_id, newer.id)
+        self.assertEqual(
+            list(Submission.objects.filter(assignment=self.assignment, is_best=True).values_list('id', flat=True)),
+            [newer.id]
+        )
+
+    @override_settings(TASKS_ALWAYS_EAGER=True, JUDGE0_CALLBACK_URL='https://checkmate.test/api/v1/judge0/callback')
+    @patch.object(Judge0Backend, 'submit_code')
+    def test_judge0_callbacks_finalize_job(self, mock_submit_code):
+        """Test that a grading job is finalized once Judge0 has called back for every test case."""
+        self.client.force_authenticate(user=self.student)
+        mock_submit_code.side_effect = lambda code, language_id, test_cases, callback_url: [
+            {'token': f'token-{i}'} for i in range(len(test_cases))
+        ]
+
+        url = reverse('assignment-submit', kwargs={'pk': self.assignment.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {'code': 'print("callback")'}, format='json')
+
+        job = GradingJob.objects.get(pk=response.data['id'])
+        self.assertEqual(job.status, GradingJob.Status.RUNNING)
+        self.assertEqual(len(job.tokens), 6)
+        callback_url = mock_submit_code.call_args.args[3]
+        self.assertTrue(callback_url.endswith(f'/{job.id}/{grading_service.sign(job.id)}'))
+
+        self.client.logout()
+        forged = reverse('judge0-callback', kwargs={'pk': job.id, 'signature': 'forged'})
+        self.assertEqual(self.client.put(forged, {}, format='json').status_code, status.HTTP_403_FORBIDDEN)
+
+        callback = reverse('judge0-callback', kwargs={'pk': job.id, 'signature': grading_service.sign(job.id)})
+        for token in job.tokens:
+            response = self.client.put(callback, {
+                'token': token,
+                'stdout': 'dGVzdF9vdXRwdXQK',
+                'time': '0.01',
+                'status': {'id': 3, 'description': 'Accepted'}
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, GradingJob.Status.COMPLETED)
+        self.assertEqual(job.submission.score, 100)
+        self.assertEqual(job.submission.results['submission_result'][0]['output'], 'test_output\n')
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    @patch.object(Judge0Backend, 'get_submission_result')
+    def test_stale_callback_job_is_reconciled(self, mock_get_submission_result):
+        """Test that a callback job whose callbacks were lost is finalized from the stored results."""
+        self.client.force_authenticate(user=self.student)
+        accepted = {'output': 'test_output', 'time': '0.01s', 'status': 'Accepted'}
+        job = GradingJob.objects.create(
+            assignment=self.assignment,
+            student=self.student,
+            code='print("lost")',
+            status=GradingJob.Status.RUNNING,
+            tokens=[f'token-{i}' for i in range(6)],
+            results={'token-0': accepted}
+        )
+        mock_get_submission_result.return_value = {'submission_result': [accepted] * 5}
+
+        GradingJob.objects.filter(pk=job.id).update(updated_at=timezone.now() - timezone.timedelta(hours=1))
+        response = self.client.get(reverse('grading-job-detail', kwargs={'pk': job.id}))
+
+        self.assertEqual(response.data['status'], GradingJob.Status.COMPLETED)
+        self.assertEqual(response.data['result']['score'], 100)
+        mock_get_submission_result.assert_called_once_with([{'token': f'token-{i}'} for i in range(1, 6)])
+
+    @override_settings(EXECUTOR_BREAKER_MIN_CALLS=2, EXECUTOR_BREAKER_FAILURE_RATE=0.5)
+    def test_submission_rejected_while_circuit_open(self):
+        """Test that submissions fail fast with a retry-after while the executor is unhealthy."""
+        self.client.force_authenticate(user=self.student)
+        cache.delete_many([CircuitBreaker.OPEN_KEY, CircuitBreaker.CALLS_KEY, CircuitBreaker.FAILURES_KEY])
+        for _ in range(2):
+            circuit_breaker.record(failed=True)
+
+        url = reverse('assignment-submit', kwargs={'pk': self.assignment.id})
+        response = self.client.post(url, {'code': 'print(1)'}, format='json')
+        cache.delete(CircuitBreaker.OPEN_KEY)
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertTrue(int(response['Retry-After']) > 0)
+        self.assertFalse(GradingJob.objects.filter(code='print(1)').exists())
 
     def test_submission_after_deadline(self):
         """Test submission after assignment deadline."""
@@ -250,9 +786,45 @@ class AssignmentViewsTest(APITestCase):
         response = self.client.get(url)
     
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertTrue(len(response.data) > 0)
-        self.assertEqual(response.data[0]['score'], 90.0)
-        self.assertTrue(response.data[0]['is_best'])
+        self.assertTrue(len(response.data['results']) > 0)
+        self.assertEqual(response.data['results'][0]['score'], 90.0)
+        self.assertTrue(response.data['results'][0]['is_best'])
+
+    def test_student_submission_list_defers_large_fields(self):
+        """Test that code and results are only loaded when requested."""
+        self.client.force_authenticate(user=self.student)
+        url = reverse('student-submissions', kwargs={'pk': self.assignment.id})
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertNotIn('code', response.data['results'][0])
+        self.assertNotIn('results', response.data['results'][0])
+        self.assertFalse(any('"code"' in query['sql'] for query in context.captured_queries))
+
+        response = self.client.get(url, {'include': 'code,results'})
+        self.assertEqual(response.data['results'][0]['code'], self.submission.code)
+        self.assertEqual(response.data['results'][0]['results'], self.submission.results)
+
+    def test_student_submission_list_pagination(self):
+        """Test that submissions are paged newest first with cursors."""
+        self.client.force_authenticate(user=self.student)
+        for score in (10.0, 20.0):
+            Submission.objects.create(
+                assignment=self.assignment,
+                student=self.student,
+                code='print(1)',
+                score=score,
+                results={'submission_result': []}
+            )
+
+        url = reverse('student-submissions', kwargs={'pk': self.assignment.id})
+        first_page = self.client.get(url, {'page_size': 2})
+        self.assertEqual([s['score'] for s in first_page.data['results']], [20.0, 10.0])
+        self.assertIsNotNone(first_page.data['next'])
+
+        second_page = self.client.get(first_page.data['next'])
+        self.assertEqual([s['score'] for s in second_page.data['results']], [90.0])
+        self.assertIsNone(second_page.data['next'])
 
     def test_submission_detail_view(self):
         """Test retrieving submission details."""
@@ -301,14 +873,120 @@ class AssignmentViewsTest(APITestCase):
         self.client.force_authenticate(user=self.lecturer)
 
         url = reverse('assignment-result', kwargs={'pk': self.assignment.id})
+        response = self.client.get(url, {'include': 'code'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(len(response.data['results']) > 0)
+        self.assertEqual(response.data['results'][0]['score'], 90.0)
+        self.assertEqual(response.data['results'][0]['code'], self.submission.code)
+        self.assertEqual(response.data['results'][0]['student']['first_name'], self.submission.student.first_name)
+        self.assertEqual(response.data['results'][0]['student']['last_name'], self.submission.student.last_name)
+        self.assertEqual(response.data['results'][0]['student']['department'], self.submission.student.department)
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    def _add_students(self, count):
+        start = User.objects.count()
+        for index in range(start, start + count):
+            student = User.objects.create_user(
+                first_name=f'student{index}',
+                last_name='doe',
+                email=f'student{index}@example.com',
+                password='testpass',
+                role='STUDENT'
+            )
+            Student.objects.create(user=student, matric=f'CSC{index:04d}')
+            submission = Submission.objects.create(
+                assignment=self.assignment,
+                student=student,
+                code='print(1)',
+                score=50.0,
+                results={'submission_result': []}
+            )
+            Feedback.objects.create(submission=submission, content='Good work')
+
+    def test_listings_use_constant_queries(self):
+        """Test that result and feedback listings do not issue a query per row"""
+        self.client.force_authenticate(user=self.lecturer)
+        results_url = reverse('assignment-result', kwargs={'pk': self.assignment.id})
+        feedback_url = reverse('feedback-list')
+
+        self._add_students(1)
+        results_queries = self._count_queries(results_url)
+        feedback_queries = self._count_queries(feedback_url)
+
+        self._add_students(5)
+        self.assertEqual(self._count_queries(results_url), results_queries)
+        self.assertEqual(self._count_queries(feedback_url), feedback_queries)
+
+    def test_assignment_statistics(self):
+        """Test that statistics are maintained as submissions are stored"""
+        other = User.objects.create_user(
+            first_name='other',
+            last_name='doe',
+            email='other@example.com',
+            password='testpass',
+            role='STUDENT'
+        )
+        self.client.force_authenticate(user=self.lecturer)
+        url = reverse('assignment-statistics', kwargs={'pk': self.assignment.id})
+
+        # statistics that were never recorded are built on first read
         response = self.client.get(url)
+        self.assertEqual(response.data['attempt_count'], 1)
+        self.assertEqual(response.data['student_count'], 1)
+
+        test_case_ids = TestCase.objects.test_case_ids(self.assignment.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            for student, score, passed in ((self.student, 100.0, 6), (other, 50.0, 3), (other, 0.0, 0)):
+                Submission.objects.create(
+                    assignment=self.assignment,
+                    student=student,
+                    code='print(1)',
+                    score=score,
+                    results={'submission_result': [
+                        {'output': '', 'time': '0.5s', 'status': 'Accepted' if index < passed else 'Wrong Answer'}
+                        for index in range(len(test_case_ids))
+                    ]}
+                )
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertTrue(len(response.data) > 0)
-        self.assertEqual(response.data[0]['score'], 90.0)
-        self.assertEqual(response.data[0]['code'], self.submission.code)
-        self.assertEqual(response.data[0]['student']['first_name'], self.submission.student.first_name)
-        self.assertEqual(response.data[0]['student']['last_name'], self.submission.student.last_name)
-        self.assertEqual(response.data[0]['student']['department'], self.submission.student.department)
+        self.assertEqual(response.data['attempt_count'], 4)
+        self.assertEqual(response.data['student_count'], 2)
+        self.assertEqual(response.data['mean_score'], 75.0)
+        self.assertEqual(response.data['median_score'], 75.0)
+        self.assertEqual(response.data['score_distribution'][5]['count'], 1)
+        self.assertEqual(response.data['score_distribution'][9]['count'], 1)
+        self.assertEqual(
+            {tc['test_case_id']: (tc['attempts'], tc['passes']) for tc in response.data['test_cases']},
+            {test_case_id: (3, 2 if index < 3 else 1) for index, test_case_id in enumerate(test_case_ids)}
+        )
+        self.assertEqual(response.data['average_runtime'], 0.5)
+
+        # a new test case does not shift the counters of the existing ones
+        added = TestCase.objects.create(assignment=self.assignment, input='added', output='added')
+        test_case_ids = TestCase.objects.test_case_ids(self.assignment.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            Submission.objects.create(
+                assignment=self.assignment,
+                student=other,
+                code='print(2)',
+                score=0.0,
+                results={'submission_result': [
+                    {'output': '', 'time': '0.5s', 'status': 'Accepted' if test_case_id == str(added.id) else 'Wrong Answer'}
+                    for test_case_id in test_case_ids
+                ]}
+            )
+
+        test_cases = {tc['test_case_id']: tc for tc in self.client.get(url).data['test_cases']}
+        self.assertEqual((test_cases[str(added.id)]['attempts'], test_cases[str(added.id)]['passes']), (1, 1))
+        self.assertEqual(test_cases[str(self.test_case.id)]['attempts'], 4)
 
     def test_best_submission(self):
         """Test that the best submission is correctly identified"""
@@ -328,3 +1006,383 @@ class AssignmentViewsTest(APITestCase):
 
         # Check that the new submission is the best
         self.assertTrue(Submission.objects.get(pk=new_submission.id).is_best)
+        best = BestSubmission.objects.get(assignment=self.assignment, student=self.student)
+        self.assertEqual((best.submission_id, best.score), (new_submission.id, 95.0))
+
+    def test_lower_scoring_submission_keeps_best(self):
+        """Test that a lower score does not replace the best submission and only touches a constant number of rows"""
+        for score in (10.0, 20.0, 30.0):
+            Submission.objects.create(
+                assignment=self.assignment,
+                student=self.student,
+                code='print(1)',
+                score=score,
+                results={'submission_result': []}
+            )
+
+        # savepoint, insert, lock the best row, release the savepoint
+        with self.assertNumQueries(4):
+            lower = Submission.objects.create(
+                assignment=self.assignment,
+                student=self.student,
+                code='print(2)',
+                score=50.0,
+                results={'submission_result': []}
+            )
+
+        self.assertFalse(lower.is_best)
+        self.assertFalse(Submission.objects.get(pk=lower.id).is_best)
+        best = BestSubmission.objects.get(assignment=self.assignment, student=self.student)
+        self.assertEqual(best.submission_id, self.submission.id)
+
+
+class Judge0BackendTest(SimpleTestCase):
+    def setUp(self):
+        self.service = Judge0Backend()
+
+    def _batch_response(self, *submissions):
+        response = Mock()
+        response.json.return_value = {'submissions': list(submissions)}
+        return response
+
+    @patch('assignment.backends.time.sleep')
+    @patch('assignment.backends.requests.Session.get')
+    def test_polls_only_pending_tokens(self, mock_get, mock_sleep):
+        """Test that pending submissions are re-queried until they finish."""
+        accepted = {'id': 3, 'description': 'Accepted'}
+        mock_get.side_effect = [
+            self._batch_response(
+                {'token': 'a', 'stdout': 'out', 'time': '0.1', 'status': accepted},
+                {'token': 'b', 'status': {'id': 1, 'description': 'In Queue'}},
+            ),
+            self._batch_response(
+                {'token': 'b', 'stdout': 'out', 'time': '0.2', 'status': accepted},
+            ),
+        ]
+
+        result = self.service.get_submission_result([{'token': 'a'}, {'token': 'b'}])
+
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(mock_get.call_args.kwargs['params']['tokens'], 'b')
+        self.assertEqual(mock_sleep.call_count, 1)
+        self.assertEqual(
+            [r['status'] for r in result['submission_result']],
+            ['Accepted', 'Accepted']
+        )
+
+    @override_settings(JUDGE0_POLL_TIMEOUT=0)
+    @patch('assignment.backends.time.sleep')
+    @patch('assignment.backends.requests.Session.get')
+    def test_polling_deadline(self, mock_get, mock_sleep):
+        """Test that polling gives up once the deadline is exceeded."""
+        mock_get.return_value = self._batch_response(
+            {'token': 'a', 'status': {'id': 2, 'description': 'Processing'}}
+        )
+
+        with self.assertRaises(SubmissionPendingError):
+            self.service.get_submission_result([{'token': 'a'}])
+        mock_sleep.assert_not_called()
+
+
+    @patch('assignment.backends.asyncio.sleep', new_callable=AsyncMock)
+    def test_async_execution_polls_without_blocking(self, mock_sleep):
+        """Test that async execution submits and polls through the async client."""
+        accepted = {'id': 3, 'description': 'Accepted'}
+        self.service.batcher = None
+        self.service._apost_batch = AsyncMock(return_value=[{'token': 'a'}, {'token': 'b'}])
+        self.service._afetch_submissions = AsyncMock(side_effect=[
+            [
+                {'token': 'a', 'stdout': 'out', 'time': '0.1', 'status': accepted},
+                {'token': 'b', 'status': {'id': 1, 'description': 'In Queue'}},
+            ],
+            [{'token': 'b', 'stdout': 'out', 'time': '0.2', 'status': accepted}],
+        ])
+        reported = []
+
+        result = async_to_sync(self.service.aexecute)(
+            'print("out")', 71,
+            [{'input': '', 'output': 'out'}, {'input': '', 'output': 'out'}],
+            on_result=lambda index, result: reported.append(index)
+        )
+
+        self.assertEqual(self.service._afetch_submissions.await_args.args[0], ['b'])
+        mock_sleep.assert_awaited_once()
+        self.assertEqual(reported, [0, 1])
+        self.assertEqual([r['time'] for r in result['submission_result']], ['0.1s', '0.2s'])
+
+    @patch('assignment.backends.requests.Session.get')
+    def test_requests_use_pooled_session(self, mock_get):
+        """Test that Judge0 calls go through the keep-alive session with timeouts."""
+        mock_get.return_value = self._batch_response(
+            {'token': 'a', 'stdout': 'out', 'time': '0.1', 'status': {'id': 3, 'description': 'Accepted'}}
+        )
+
+        self.service.get_submission_result([{'token': 'a'}])
+
+        self.assertEqual(mock_get.call_args.kwargs['timeout'], self.service.timeout)
+        self.assertEqual(self.service.session.headers['x-rapidapi-host'], 'judge0-ce.p.rapidapi.com')
+        self.assertEqual(self.service.connection_stats()['reused'], 0)
+
+
+    @override_settings(JUDGE0_BATCH_SIZE=2)
+    @patch.object(Judge0Backend, 'get_submission_result')
+    @patch.object(Judge0Backend, 'submit_code')
+    def test_large_batches_are_chunked(self, mock_submit_code, mock_get_submission_result):
+        """Test that test cases above the batch limit are split and reassembled in order."""
+        mock_submit_code.side_effect = lambda code, language_id, test_cases: [
+            {'token': tc['input']} for tc in test_cases
+        ]
+        mock_get_submission_result.side_effect = lambda tokens: {'submission_result': [
+            {'output': t['token'], 'time': '0.1s', 'status': 'Accepted'} for t in tokens
+        ]}
+        test_cases = [{'input': str(i), 'output': str(i)} for i in range(5)]
+
+        result = self.service.execute('print(input())', 71, test_cases)
+
+        self.assertEqual(mock_submit_code.call_count, 3)
+        self.assertTrue(all(len(call.args[2]) <= 2 for call in mock_submit_code.call_args_list))
+        self.assertEqual([r['output'] for r in result['submission_result']], ['0', '1', '2', '3', '4'])
+
+class MicroBatcherTest(SimpleTestCase):
+    def test_concurrent_submissions_share_batches(self):
+        """Test that submissions from concurrent callers are posted together and demultiplexed."""
+        posted = []
+
+        def post_batch(submissions):
+            posted.append(len(submissions))
+            return [{'token': submission['stdin']} for submission in submissions]
+
+        batcher = MicroBatcher(post_batch, window=0.2, max_size=20, workers=2)
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            results = list(executor.map(
+                lambda caller: batcher.submit([{'stdin': f'{caller}-{i}'} for i in range(2)]),
+                range(5)
+            ))
+
+        self.assertEqual(sum(posted), 10)
+        self.assertLess(len(posted), 5)
+        for caller, tokens in enumerate(results):
+            self.assertEqual(tokens, [{'token': f'{caller}-0'}, {'token': f'{caller}-1'}])
+
+    def test_batch_errors_are_raised_to_every_caller(self):
+        """Test that a failed batch request fails every caller waiting on it."""
+        def post_batch(submissions):
+            raise requests.exceptions.ConnectionError('Judge0 unavailable')
+
+        batcher = MicroBatcher(post_batch, window=0, max_size=20, workers=1)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            batcher.submit([{'stdin': 'a'}])
+
+class ConcurrencyLimiterTest(SimpleTestCase):
+    @override_settings(EXECUTOR_CLUSTER_MAX_IN_FLIGHT=1, EXECUTOR_SLOT_TIMEOUT=0.2)
+    def test_cluster_limit(self):
+        """Test that executions beyond the cluster wide limit are rejected."""
+        cache.delete(ConcurrencyLimiter.CLUSTER_KEY)
+        limiter = ConcurrencyLimiter()
+
+        with limiter.slot():
+            with self.assertRaises(ExecutorUnavailableError):
+                with limiter.slot():
+                    pass
+
+        # the slot is released once the execution finishes
+        with limiter.slot():
+            self.assertEqual(cache.get(ConcurrencyLimiter.CLUSTER_KEY), 1)
+
+    @override_settings(
+        EXECUTOR_CLUSTER_MAX_IN_FLIGHT=1, EXECUTOR_SLOT_TIMEOUT=0.2,
+        EXECUTOR_BREAKER_MIN_CALLS=2, EXECUTOR_BREAKER_FAILURE_RATE=0.5,
+        CODE_EXECUTION_BACKEND='local'
+    )
+    def test_rejections_do_not_open_the_breaker(self):
+        """Test that callers rejected by the limiter are not counted as executor failures."""
+        cache.delete_many([
+            ConcurrencyLimiter.CLUSTER_KEY, CircuitBreaker.OPEN_KEY, CircuitBreaker.CALLS_KEY, CircuitBreaker.FAILURES_KEY
+        ])
+        service = CodeExecutionService()
+
+        with patch.object(LocalExecutionBackend, 'execute') as mock_execute, concurrency_limiter.slot():
+            for _ in range(3):
+                with self.assertRaises(ExecutorUnavailableError) as context:
+                    service.execute('print(1)  # rejected', 71, [{'input': '', 'output': '1'}])
+                self.assertEqual(context.exception.retry_after, 1)
+
+        mock_execute.assert_not_called()
+        circuit_breaker.check()
+
+@override_settings(LOCAL_RUNNER_TIME_LIMIT=1)
+class LocalExecutionBackendTest(SimpleTestCase):
+    def setUp(self):
+        self.backend = LocalExecutionBackend()
+
+    def test_runs_test_cases_in_order(self):
+        """Test that each test case is run and compared with its expected output."""
+        result = self.backend.execute('print(input()[::-1])', 71, [
+            {'input': 'abc', 'output': 'cba'},
+            {'input': 'xyz', 'output': 'xyz'},
+        ])
+
+        self.assertEqual(
+            [r['status'] for r in result['submission_result']],
+            ['Accepted', 'Wrong Answer']
+        )
+        self.assertEqual(result['submission_result'][0]['output'], 'cba\n')
+
+    def test_time_and_runtime_errors(self):
+        """Test that infinite loops and crashes are reported with Judge0 statuses."""
+        looping = self.backend.execute('while True: pass', 71, [{'input': '', 'output': ''}])
+        crashing = self.backend.execute('raise SystemExit(1)', 71, [{'input': '', 'output': ''}])
+
+        self.assertEqual(looping['submission_result'][0]['status'], 'Time Limit Exceeded')
+        self.assertEqual(crashing['submission_result'][0]['status'], 'Runtime Error (NZEC)')
+
+    def test_child_processes_are_killed(self):
+        """Test that processes started by a program do not outlive it."""
+        code = 'import subprocess\nsubprocess.Popen(["sleep", "37"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)\nprint("ok")'
+        result = self.backend.execute(code, 71, [{'input': '', 'output': 'ok'}])
+        holding = self.backend.execute('import subprocess\nsubprocess.Popen(["sleep", "38"])', 71, [{'input': '', 'output': ''}])
+
+        self.assertEqual(result['submission_result'][0]['status'], 'Accepted')
+        # output goes to files, so a child holding on to it does not keep the test case running
+        self.assertEqual(holding['submission_result'][0]['status'], 'Accepted')
+        self.assertNotEqual(subprocess.run(['pgrep', '-f', 'sleep 3[78]'], capture_output=True).returncode, 0)
+
+    @override_settings(LOCAL_RUNNER_TIME_LIMIT=5, LOCAL_RUNNER_OUTPUT_LIMIT=64 * 1024)
+    def test_output_flood_is_limited(self):
+        """Test that a program writing endless output is stopped at the output limit."""
+        python = self.backend.execute("import sys\nwhile True: sys.stdout.write('x' * 65536)", 71, [{'input': '', 'output': ''}])
+        c = self.backend.execute(
+            '#include <stdio.h>\nint main() { for (;;) fputs("xxxxxxxx", stdout); }', 50, [{'input': '', 'output': ''}]
+        )
+
+        for result in (python['submission_result'][0], c['submission_result'][0]):
+            self.assertEqual(result['status'], 'Runtime Error (SIGXFSZ)')
+            self.assertLessEqual(len(result['output']), 64 * 1024)
+            self.assertLess(float(result['time'].rstrip('s')), 5)
+
+    @skipUnless(shutil.which('node'), 'node is not installed')
+    def test_node_runs_within_memory_limit(self):
+        """Test that the memory limit leaves room for runtimes reserving a large address space."""
+        result = self.backend.execute('console.log([1, 2].map(x => x * 2).join())', 63, [{'input': '', 'output': '2,4'}])
+        self.assertEqual(result['submission_result'][0]['status'], 'Accepted')
+
+    def test_only_uncached_test_cases_are_executed(self):
+        """Test that memoized test case results are reused when test cases change."""
+        service = CodeExecutionService()
+        code = 'print(input())  # memoized'
+
+        with patch.object(LocalExecutionBackend, 'execute', wraps=service.backends['local'].execute) as mock_execute, \
+                override_settings(CODE_EXECUTION_BACKEND='local'):
+            service.execute(code, 71, [{'input': 'a', 'output': 'a'}, {'input': 'b', 'output': 'b'}])
+            result = service.execute(code, 71, [
+                {'input': 'a', 'output': 'a'},
+                {'input': 'c', 'output': 'x'},
+                {'input': 'b', 'output': 'b'},
+            ])
+
+        self.assertEqual(mock_execute.call_count, 2)
+        self.assertEqual(mock_execute.call_args.args[2], [{'input': 'c', 'output': 'x'}])
+        self.assertEqual(
+            [r['status'] for r in result['submission_result']],
+            ['Accepted', 'Wrong Answer', 'Accepted']
+        )
+
+    @override_settings(CODE_EXECUTION_BACKEND='judge0', CODE_EXECUTION_LANGUAGE_BACKENDS={71: 'local'})
+    def test_language_routing(self):
+        """Test that languages can be routed to a specific backend."""
+        service = CodeExecutionService()
+
+        self.assertIsInstance(service.get_backend(71), LocalExecutionBackend)
+        self.assertIsInstance(service.get_backend(62), Judge0Backend)
+
+
+class FeedbackCacheTest(SimpleTestCase):
+    def test_fingerprint_ignores_layout_comments_and_names(self):
+        """Test that only the structure of the code changes its fingerprint."""
+        code = 'def solve(nums):\n    total = 0\n    for n in nums:\n        total += n\n    return total'
+        similar = 'def solve(xs):  # sum\n    t=0\n\n    for x in xs:\n        t+=x\n    return t\n'
+        self.assertEqual(feedback_cache.fingerprint(code, True, True), feedback_cache.fingerprint(similar, True, True))
+        self.assertNotEqual(
+            feedback_cache.fingerprint(code, True, True),
+            feedback_cache.fingerprint(similar.replace('    return t', 'return t'), True, True)
+        )
+        self.assertNotEqual(
+            feedback_cache.fingerprint('print(x // 2)', True, True), feedback_cache.fingerprint('print(x // 3)', True, True)
+        )
+        self.assertNotEqual(feedback_cache.fingerprint('print(x)'), feedback_cache.fingerprint('input(x)'))
+        self.assertEqual(
+            feedback_cache.fingerprint('int main(){ int a=1; return a; }'),
+            feedback_cache.fingerprint('int main() {\n  int b = 1; /* b */\n  return b;\n}')
+        )
+
+    def test_preprocessor_lines_are_significant_in_c(self):
+        """Test that # lines are only dropped as comments in languages where they are comments."""
+        code = '#include <stdio.h>\n#define N 10\nint main() { printf("%d", N); }'
+        self.assertNotEqual(feedback_cache.fingerprint(code), feedback_cache.fingerprint(code.replace('10', '20')))
+        self.assertNotEqual(feedback_cache.fingerprint(code), feedback_cache.fingerprint(code.replace('stdio', 'math')))
+
+        c = Mock(id='assignment-id', language_id=50, programming_language='C (GCC 9.2.0)')
+        python = Mock(id='assignment-id', language_id=71, programming_language='Python (3.8.1)')
+        self.assertNotEqual(feedback_cache.make_key(c, code), feedback_cache.make_key(c, code.replace('10', '20')))
+        self.assertEqual(feedback_cache.make_key(python, 'print(1)  # one'), feedback_cache.make_key(python, 'print(1)'))
+
+
+class GradingCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.assignment = Mock(id='assignment-id', language_id=71)
+        self.test_cases = [{'input': '1', 'output': '2'}]
+        self.results = {'submission_result': [{'output': '2', 'time': '0.1s', 'status': 'Accepted'}]}
+
+    def test_edited_test_cases_miss_the_cache(self):
+        """Test that results cached for a test case set are not served once it changes."""
+        grading_cache.set(self.assignment, 'print(2)', self.test_cases, self.results)
+        self.assertEqual(grading_cache.get(self.assignment, 'print(2)', self.test_cases), self.results)
+
+        edited = [{'input': '1', 'output': '3'}]
+        self.assertIsNone(grading_cache.get(self.assignment, 'print(2)', edited))
+        self.assertIsNone(grading_cache.get(self.assignment, 'print(2)', self.test_cases + edited))
+
+    def test_transient_results_are_not_cached(self):
+        """Test that results with a verdict caused by load are executed again."""
+        timed_out = {'submission_result': [
+            {'output': '2', 'time': '0.1s', 'status': 'Accepted'},
+            {'output': '', 'time': '2s', 'status': 'Time Limit Exceeded'},
+        ]}
+        self.assertFalse(grading_cache.set(self.assignment, 'print(4)', self.test_cases, timed_out))
+        self.assertIsNone(grading_cache.get(self.assignment, 'print(4)', self.test_cases))
+
+    @override_settings(GRADING_CACHE_MAX_ENTRY_BYTES=10)
+    def test_oversized_entries_are_not_cached(self):
+        """Test that results above the size limit are not cached."""
+        self.assertFalse(grading_cache.set(self.assignment, 'print(3)', self.test_cases, self.results))
+        self.assertIsNone(grading_cache.get(self.assignment, 'print(3)', self.test_cases))
+
+
+class TaskQueueTest(SimpleTestCase):
+    @override_settings(GRADING_WORKERS=1, FEEDBACK_WORKERS=1)
+    def test_feedback_runs_while_grading_workers_are_busy(self):
+        """Test that feedback jobs are not queued behind grading jobs."""
+        grading, feedback = TaskQueue(), TaskQueue('FEEDBACK_WORKERS', 'checkmate-feedback')
+        release = threading.Event()
+        grading.enqueue(release.wait, 5)
+        try:
+            self.assertEqual(feedback.enqueue(str, 'done').result(timeout=1), 'done')
+        finally:
+            release.set()
+
+
+class LLMClientTest(SimpleTestCase):
+    @override_settings(LLM_TIMEOUT=5)
+    @patch('assignment.llm.genai')
+    def test_model_is_shared_across_threads(self, mock_genai):
+        """Test that the client is configured once and reused by concurrent callers."""
+        mock_genai.GenerativeModel.return_value.generate_content.side_effect = lambda *args, **kwargs: [Mock(text='Nice '), Mock(text='work')]
+        client = LLMClient()
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            responses = list(executor.map(lambda prompt: ''.join(client.stream(prompt)), ['prompt'] * 10))
+
+        self.assertEqual(responses, ['Nice work'] * 10)
+        mock_genai.configure.assert_called_once()
+        mock_genai.GenerativeModel.assert_called_once()
+        mock_genai.GenerativeModel.return_value.generate_content.assert_called_with('prompt', stream=True, request_options={'timeout': 5})
@@ -6,11 +6,18 @@ from .views import (
     SubmissionDetailView,
     AssignmentResultData,
     FeedbackGenerationView,
+    FeedbackJobDetailView,
+    FeedbackStreamView,
     RateFeedbackView,
     FeedbackListView,
     PublishAssignmentView,
     RetrieveProgrammingLanguages,
-    RetrieveProgressView
+    RetrieveProgressView,
+    GradingJobDetailView,
+    RegradeAssignmentView,
+    Judge0CallbackView,
+    GradingJobStreamView,
+    AssignmentStatisticsView
     )
 
 urlpatterns = [
@@ -19,10 +26,17 @@ urlpatterns = [
     path('assignments/<uuid:pk>/submissions', StudentSubmissionListView.as_view(), name='student-submissions'),
     path('assignments/<uuid:pk>/publish', PublishAssignmentView.as_view(), name='publish-assignment'),
     path('submissions/<uuid:pk>', SubmissionDetailView.as_view(), name='submission-detail'),
+    path('assignments/<uuid:pk>/regrade', RegradeAssignmentView.as_view(), name='regrade-assignment'),
     path('assignments/<uuid:pk>/results', AssignmentResultData.as_view(), name='assignment-result'),
+    path('assignments/<uuid:pk>/statistics', AssignmentStatisticsView.as_view(), name='assignment-statistics'),
     path('submissions/<uuid:pk>/feedback', FeedbackGenerationView.as_view(), name='generate-feedback'),
+    path('submissions/<uuid:pk>/feedback/stream', FeedbackStreamView.as_view(), name='feedback-stream'),
+    path('feedback-jobs/<uuid:pk>', FeedbackJobDetailView.as_view(), name='feedback-job-detail'),
     path('feedback/<uuid:pk>/rate', RateFeedbackView.as_view(), name='rate-feedback'),
     path('feedback', FeedbackListView.as_view(), name='feedback-list'),
     path('languages', RetrieveProgrammingLanguages.as_view(), name='programming-languages'),
-    path('assignments/<uuid:pk>/progress', RetrieveProgressView.as_view(), name='fetch-progress')
+    path('assignments/<uuid:pk>/progress', RetrieveProgressView.as_view(), name='fetch-progress'),
+    path('grading-jobs/<uuid:pk>', GradingJobDetailView.as_view(), name='grading-job-detail'),
+    path('grading-jobs/<uuid:pk>/stream', GradingJobStreamView.as_view(), name='grading-job-stream'),
+    path('judge0/callback/<uuid:pk>/<str:signature>', Judge0CallbackView.as_view(), name='judge0-callback')
 ]
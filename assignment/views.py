@@ -1,19 +1,29 @@
 from rest_framework.views import APIView
+from adrf.views import APIView as AsyncAPIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework import generics, status
 from django_filters import rest_framework as filters
 from account.permissions import IsLecturerPermission, IsStudentPermission
 from drf_spectacular.utils import extend_schema, OpenApiParameter
-from .models import Assignment, Course, Submission, Feedback, TestCase
-from django.shortcuts import get_object_or_404
-from django.db import transaction
-from django.core.cache import cache
+from .models import Assignment, AssignmentStatistics, Course, Submission, BestSubmission, Feedback, FeedbackJob, TestCase, GradingJob
+from django.shortcuts import get_object_or_404, aget_object_or_404
+from django.http import StreamingHttpResponse
 from django.utils import timezone
+from asgiref.sync import sync_to_async
 from .filters import AssignmentFilter
-import google.generativeai as genai
 from .service import code_execution_service
-import logging, environ, logging, json
+from .grading import grading_service
+from .feedback import feedback_service
+from .regrade import regrade_service, RegradeInProgressError
+from .tasks import task_queue
+from .resilience import circuit_breaker, ExecutorUnavailableError
+from .streaming import EventStreamRenderer, grading_job_events, feedback_events
+from .pagination import SubmissionCursorPagination, FeedbackCursorPagination
+from .mixins import DeferredFieldsMixin
+from checkmate.fieldsets import SparseFieldsetMixin, FIELDS_PARAMETER
+import logging
 from .serializers import (
     AssignmentSerializer,
     AssignmentListSerializer,
@@ -25,10 +35,12 @@ from .serializers import (
     FeedbackRatingSerializer,
     FeedbackListSerializer,
     ProgrammingLanguageSerializer,
+    GradingJobSerializer,
+    FeedbackJobSerializer,
+    AssignmentStatisticsSerializer,
 )
 
 logger = logging.getLogger(__name__)
-env = environ.Env()
 
 @extend_schema(tags=['assignments'])
 class AssignmentCreateView(APIView):
@@ -70,10 +82,11 @@ class PublishAssignmentView(APIView):
 @extend_schema(
     tags=['assignments'],
     parameters=[
-        OpenApiParameter(name='is_draft', description='Filter assignments by draft status', required=False, type=bool)
+        OpenApiParameter(name='is_draft', description='Filter assignments by draft status', required=False, type=bool),
+        FIELDS_PARAMETER
     ]
 )
-class AssignmentListView(generics.ListAPIView):
+class AssignmentListView(SparseFieldsetMixin, generics.ListAPIView):
     """
     API endpoint for retrieving all assignments for a course
 
@@ -88,7 +101,8 @@ class AssignmentListView(generics.ListAPIView):
         return Assignment.objects.filter(course=self.kwargs['pk'])
 
 
-class AssignmentDetailView(generics.RetrieveAPIView):
+@extend_schema(parameters=[FIELDS_PARAMETER])
+class AssignmentDetailView(SparseFieldsetMixin, generics.RetrieveAPIView):
     """
     API endpoint for retrieving an assignment by its id
 
@@ -96,18 +110,29 @@ class AssignmentDetailView(generics.RetrieveAPIView):
     """
     serializer_class = AssignmentDetailSerializer
     permission_classes = [IsAuthenticated]
-    queryset = Assignment.objects.all()
+    queryset = Assignment.objects.select_related('course__lecturer')
     lookup_field = 'pk'
 
     def get(self, request, *args, **kwargs):
         assignment = self.get_object()
-        visible_test_cases = TestCase.objects.filter(assignment=assignment, is_hidden=False)
-        assignment_data = self.get_serializer(assignment).data
-        assignment_data['test_cases'] = list(visible_test_cases.values('id', 'input', 'output'))
+        serializer = self.get_serializer(assignment)
+
+        # only visible test cases are returned, so they are not serialized with the assignment
+        include_test_cases = serializer.fields.pop('test_cases', None) is not None
+        assignment_data = serializer.data
+        if include_test_cases:
+            visible_test_cases = TestCase.objects.filter(assignment=assignment, is_hidden=False)
+            assignment_data['test_cases'] = list(visible_test_cases.values('id', 'input', 'output'))
         return Response(assignment_data)
 
 
-class StudentSubmissionListView(APIView):
+@extend_schema(
+    parameters=[
+        OpenApiParameter(name='include', description='Comma separated large fields to include: code, results', required=False, type=str),
+        FIELDS_PARAMETER
+    ]
+)
+class StudentSubmissionListView(DeferredFieldsMixin, SparseFieldsetMixin, generics.ListAPIView):
     """
     API endpoint for retrieving all submissions for an assignment by a student
 
@@ -116,25 +141,26 @@ class StudentSubmissionListView(APIView):
     """
     serializer_class = SubmissionSerializer
     permission_classes = [IsStudentPermission]
+    pagination_class = SubmissionCursorPagination
+    deferred_fields = {'code': 'code', 'results': 'results'}
 
-    def get(self, request, pk):
-        submissions = Submission.objects.filter(student=request.user, assignment=pk)
-        serializer = self.serializer_class(submissions, many=True)
-        return Response(serializer.data)
+    def get_queryset(self):
+        return Submission.objects.filter(student=self.request.user, assignment=self.kwargs['pk'])
 
 
-class SubmissionDetailView(generics.RetrieveAPIView):
+@extend_schema(parameters=[FIELDS_PARAMETER])
+class SubmissionDetailView(SparseFieldsetMixin, generics.RetrieveAPIView):
     """
     API endpoint for retrieving a submission by its id
 
     This view allows users to view the details of a submission made for an assignment
     """
     serializer_class = SubmissionDetailSerializer
-    queryset = Submission.objects.all()
+    queryset = Submission.objects.select_related('assignment', 'student')
     lookup_field = 'pk'
 
 
-class AssignmentSubmissionView(APIView):
+class AssignmentSubmissionView(AsyncAPIView):
     """
     API endpoint for making a code submission for an assignment
 
@@ -145,70 +171,149 @@ class AssignmentSubmissionView(APIView):
     permission_classes = [IsStudentPermission]
     throttle_scope = 'submission'
 
-    @transaction.atomic
-    def post(self, request, pk):
-        assignment = get_object_or_404(Assignment, pk=pk)
+    async def post(self, request, pk):
+        assignment = await aget_object_or_404(Assignment, pk=pk)
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
 
         if assignment.deadline < timezone.now():
             return Response({ 'message': 'Deadline exceeded for this assignment' })
 
-        # check if code is already in cache
-        if cache.get(serializer.validated_data['code']):
-            return Response(json.loads(cache.get(serializer.validated_data['code'])), status=status.HTTP_200_OK)
+        # fail fast instead of queueing work while the executor is unhealthy
+        try:
+            await sync_to_async(circuit_breaker.check)()
+        except ExecutorUnavailableError as e:
+            return Response(
+                { 'message': 'Code execution is temporarily unavailable, please try again later' },
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={ 'Retry-After': str(e.retry_after) }
+            )
+
+        # grading happens on the background workers, the client polls the job for the result
+        job = await grading_service.acreate_job(assignment, request.user, serializer.validated_data['code'])
+        if job.status == GradingJob.Status.COMPLETED:
+            return Response(GradingJobSerializer(job).data, status=status.HTTP_200_OK)
+        return Response(GradingJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class GradingJobDetailView(generics.RetrieveAPIView):
+    """
+    API endpoint for polling the status of a grading job
 
-        # Extract all the test cases created for the assignment and represent them
-        # in an input-output format for easy validation by the code execution service
-        test_cases = assignment.test_cases.values()
-        test_cases = [{"input": tc["input"], "output": tc["output"]} for tc in test_cases]
+    This view allows students to check whether their submission has been graded
+    and retrieve the results once grading is complete
+    """
+    serializer_class = GradingJobSerializer
+    permission_classes = [IsStudentPermission]
+    lookup_field = 'pk'
 
-        # retrieve tokens needed to get the assignment submission results from the judge0 API
-        try:
-            tokens = code_execution_service.submit_code(serializer.validated_data['code'], assignment.language_id,  test_cases)
-        except Exception as e:
-            return Response({ 'message': 'Could not execute code, please try again' }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    def get_queryset(self):
+        return GradingJob.objects.filter(student=self.request.user).select_related('submission')
 
-        # using the submission token to get the assignment submission result from judge0 API
-        submission_results = code_execution_service.get_submission_result(tokens)
+    def get_object(self):
+        # jobs lost by a restarted worker are recovered when they are polled
+        return grading_service.recover_stale(super().get_object())
 
-        # calculate final grade by using the number of passed test cases
-        test_case_count = len(test_cases)
-        accepted_count = 0
-        for result in submission_results["submission_result"]:
-            if result["status"] == "Accepted":
-                accepted_count += 1
 
-        score = (accepted_count / test_case_count) * assignment.max_score
+class GradingJobStreamView(APIView):
+    """
+    API endpoint for streaming the results of a grading job
 
-        # include score in the response
-        submission_results['score'] = score
+    This view pushes the verdict of each test case over server-sent events as soon
+    as it is available, followed by the final score. Under ASGI the stream is served
+    without holding a worker thread while waiting for results
+    """
+    permission_classes = [IsStudentPermission]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
 
-        # store submission in database
-        submission = Submission.objects.create(
-            assignment=assignment,
-            student=request.user,
-            code=serializer.validated_data['code'],
-            score=score,
-            results=submission_results
+    def get(self, request, pk):
+        job = get_object_or_404(GradingJob.objects.select_related('assignment'), pk=pk, student=request.user)
+        test_case_count = job.assignment.test_cases.count()
+        response = StreamingHttpResponse(
+            grading_job_events(job.id, test_case_count),
+            content_type='text/event-stream'
         )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class Judge0CallbackView(APIView):
+    """
+    API endpoint for receiving execution results from Judge0
+
+    Judge0 calls this endpoint once for every submission that finishes executing,
+    the grading job is finalized once results for all its test cases are in
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def put(self, request, pk, signature):
+        try:
+            accepted = grading_service.handle_callback(pk, signature, request.data)
+        except GradingJob.DoesNotExist:
+            return Response({ 'message': 'Grading job not found' }, status=status.HTTP_404_NOT_FOUND)
+
+        if not accepted:
+            return Response({ 'message': 'Invalid callback signature' }, status=status.HTTP_403_FORBIDDEN)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class RegradeAssignmentView(APIView):
+    """
+    API endpoint for regrading all submissions for an assignment
+
+    This view allows lecturers to rerun every submission against the current test cases
+    after they have been changed, and to track the progress of the regrade
+    """
+    permission_classes = [IsLecturerPermission]
+
+    def post(self, request, pk):
+        assignment = get_object_or_404(Assignment, pk=pk)
+        try:
+            regrade_service.acquire(assignment.id)
+        except RegradeInProgressError:
+            return Response({ 'message': 'Assignment is already being regraded' }, status=status.HTTP_409_CONFLICT)
+
+        task_queue.enqueue(regrade_service.regrade, assignment.id)
+        return Response({ 'message': 'Regrade started' }, status=status.HTTP_202_ACCEPTED)
+
+    def get(self, request, pk):
+        assignment = get_object_or_404(Assignment, pk=pk)
+        progress = regrade_service.get_progress(assignment.id)
+        if not progress:
+            return Response({ 'message': 'No regrade found for this assignment' }, status=status.HTTP_404_NOT_FOUND)
+        return Response(progress, status=status.HTTP_200_OK)
 
-        # Convert UUID to string before adding to submission_results
-        submission_results['submission_id'] = str(submission.id)
 
-        cache_data = {
-            'submission_id': str(submission.id),
-            'score': score,
-            'submission_result': submission_results['submission_result']
-        }
+class AssignmentStatisticsView(APIView):
+    """
+    API endpoint for retrieving aggregate statistics of an assignment
 
-        # store the submission results in cache for 10 minutes
-        cache.set(serializer.validated_data['code'], json.dumps(cache_data), 600)
+    This view returns attempt counts, the score distribution, pass rates per test case
+    and the average runtime, which are maintained as submissions are graded
+    """
+    permission_classes = [IsLecturerPermission]
+    serializer_class = AssignmentStatisticsSerializer
 
-        return Response(submission_results, status=status.HTTP_200_OK)
+    def get(self, request, pk):
+        assignment = get_object_or_404(Assignment, pk=pk)
+        stats = AssignmentStatistics.objects.filter(assignment=assignment).first()
+        if stats is None:
+            # built once for assignments whose statistics were never recorded
+            stats = AssignmentStatistics.objects.rebuild(assignment)
+        stats.assignment = assignment
+        serializer = self.serializer_class(stats)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class AssignmentResultData(generics.ListAPIView):
+@extend_schema(
+    parameters=[
+        OpenApiParameter(name='include', description='Comma separated large fields to include: code', required=False, type=str),
+        FIELDS_PARAMETER
+    ]
+)
+class AssignmentResultData(DeferredFieldsMixin, SparseFieldsetMixin, generics.ListAPIView):
     """
     API endpoint for retrieving aggregated assignment submissions for lecturers
 
@@ -217,68 +322,91 @@ class AssignmentResultData(generics.ListAPIView):
     """
     permission_classes = [IsLecturerPermission]
     serializer_class = AssignmentResultDataSerializer
+    pagination_class = SubmissionCursorPagination
+    deferred_fields = {'code': 'code'}
 
     def get_queryset(self):
-        return Submission.objects.filter(assignment=self.kwargs['pk'], is_best=True)
+        # the best submissions are found through the best submission table
+        return Submission.objects.filter(best_of__assignment=self.kwargs['pk']).select_related(
+            'student', 'student__student_profile'
+        ).defer('results')
 
 
-class FeedbackGenerationView(APIView):
+@extend_schema(
+    parameters=[
+        OpenApiParameter(name='refresh', description='Generate new feedback even if feedback already exists', required=False, type=bool),
+    ]
+)
+class FeedbackGenerationView(AsyncAPIView):
     """
     API endpoint for generating personalized feedback for a students submission
 
     This view takes in the submission results and generates personalized feedback for the student
-    based on the test cases that were passed and failed
+    based on the test cases that were passed and failed. Existing feedback, or feedback for
+    structurally identical code, is returned unless a refresh is requested, otherwise generation
+    happens on the background workers and the client polls the returned feedback job
     """
     permission_classes = [IsStudentPermission]
     throttle_scope = 'feedback'
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        genai.configure(api_key=env('GEMINI_API_KEY'))
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
-    
-    def post(self, request, pk):
-        if cache.get(f'feedback_{pk}'):
-            return Response({ 'feedback': cache.get(f'feedback_{pk}') }, status=status.HTTP_200_OK)
-
-        student_name = request.user.first_name
-        submission = get_object_or_404(Submission, pk=pk)
-        assignment = submission.assignment
-        prompt = f"""
-        Role: Programming Assistant providing constructive student code feedback
-
-        Key Objectives:
-        - Evaluate code correctness without giving direct solutions
-        - Assess code style and best practices
-        - Provide actionable improvement suggestions
-        - Offer positive reinforcement
-
-        Feedback Principles:
-        - Constructive and encouraging tone
-        - Preserve student's problem-solving ownership
-        - Keep feedback concise, focused and very short
-
-        Assignment Description: {assignment.description}
-        Programming Language: {assignment.programming_language}
-        Student Code Submission: {submission.code}
-        Student Name: {student_name}
-        """
-        try:
-            response = self.model.generate_content(prompt)
-        except Exception as e:
-            return Response({ 'error': 'CheckMate AI is unavailable right now' })
+    async def post(self, request, pk):
+        refresh = request.query_params.get('refresh', '').lower() in ('1', 'true')
+        # students only get feedback for their own submissions
+        submission = await aget_object_or_404(Submission.objects.select_related('assignment'), pk=pk, student=request.user)
+        if not refresh:
+            feedback = await sync_to_async(feedback_service.lookup)(submission.id)
+            if feedback is None:
+                feedback = await sync_to_async(feedback_service.reuse_similar)(submission, request.user)
+            if feedback:
+                return Response({ 'feedback': feedback }, status=status.HTTP_200_OK)
+
+        job = await sync_to_async(feedback_service.create_job)(submission, request.user)
+        return Response(FeedbackJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
 
-        # store response in database
-        feedback = Feedback(
-            submission=submission,
-            content=response.text,
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(name='refresh', description='Generate new feedback even if feedback already exists', required=False, type=bool),
+    ]
+)
+class FeedbackStreamView(APIView):
+    """
+    API endpoint for streaming personalized feedback for a students submission
+
+    This view forwards the feedback over server-sent events as the model generates it.
+    The feedback is generated by the feedback job for the submission, which is shared
+    with concurrent requests and finishes even if the client disconnects
+    """
+    permission_classes = [IsStudentPermission]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+    throttle_scope = 'feedback'
+
+    def get(self, request, pk):
+        # students only get feedback for their own submissions
+        submission = get_object_or_404(Submission.objects.select_related('assignment'), pk=pk, student=request.user)
+        refresh = request.query_params.get('refresh', '').lower() in ('1', 'true')
+        response = StreamingHttpResponse(
+            feedback_events(submission, request.user, refresh),
+            content_type='text/event-stream'
         )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
 
-        feedback.save()
 
-        # cache feedback in redis for 30 minutes
-        cache.set(f'feedback_{submission.id}', response.text, 1800)
-        return Response({ 'feedback': response.text }, status=status.HTTP_200_OK)
+class FeedbackJobDetailView(generics.RetrieveAPIView):
+    """
+    API endpoint for polling the status of a feedback job
+
+    This view allows students to check whether the feedback for their submission
+    has been generated and retrieve it once the job is complete
+    """
+    serializer_class = FeedbackJobSerializer
+    permission_classes = [IsStudentPermission]
+    lookup_field = 'pk'
+
+    def get_queryset(self):
+        return FeedbackJob.objects.filter(student=self.request.user).select_related('feedback')
 
 
 class RateFeedbackView(APIView):
@@ -308,41 +436,52 @@ class RetrieveProgressView(APIView):
 
     def get(self, request, pk):
         assignment = get_object_or_404(Assignment, pk=pk)
-        submission = Submission.objects.filter(
+        best = BestSubmission.objects.filter(
             assignment=assignment,
-            student=request.user,
-            is_best=True
-        ).order_by('-submitted_at').first()
+            student=request.user
+        ).select_related('submission').first()
 
-        if not submission:
+        if not best:
             return Response({ 'message': 'No submissions found' }, status=status.HTTP_200_OK)
 
+        submission = best.submission
+
         return Response({
             'code': submission.code,
             'solved': submission.score == 100
         }, status=status.HTTP_200_OK)
 
 
-class FeedbackListView(generics.ListAPIView):
+@extend_schema(
+    parameters=[
+        OpenApiParameter(name='include', description='Comma separated large fields to include: code', required=False, type=str),
+        FIELDS_PARAMETER
+    ]
+)
+class FeedbackListView(DeferredFieldsMixin, SparseFieldsetMixin, generics.ListAPIView):
     """
     API endpoint for retrieving all feedbacks
 
     This view lists all the feedbacks for analysis purposes
     """
     serializer_class = FeedbackListSerializer
-    queryset = Feedback.objects.all()
+    pagination_class = FeedbackCursorPagination
+    deferred_fields = {'code': 'submission__code'}
+    queryset = Feedback.objects.select_related('submission').defer('submission__results')
 
 
-class RetrieveProgrammingLanguages(generics.ListAPIView):
+class RetrieveProgrammingLanguages(AsyncAPIView):
     """
     Get a list of available programming languages
     """
     serializer_class = ProgrammingLanguageSerializer
     permission_classes = [IsAuthenticated]
 
-    def get_queryset(self):
+    async def get(self, request):
         try:
-            languages = code_execution_service.get_available_languages()
-            return languages
+            languages = await code_execution_service.aget_available_languages()
         except Exception as e:
+            logger.error(f"Error fetching programming languages: {str(e)}")
             return Response({ 'error': 'Error fetching programming languages' }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        serializer = self.serializer_class(languages, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
@@ -0,0 +1,128 @@
+from django.core.exceptions import FieldDoesNotExist
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import serializers
+from typing import Dict, List, Optional, Tuple
+
+# Nested field selection, `id,course.title` is {'id': {}, 'course': {'title': {}}}
+Fieldset = Dict[str, 'Fieldset']
+
+FIELDS_PARAMETER = OpenApiParameter(
+    name='fields',
+    description='Comma separated fields to return, nested fields are selected with dots',
+    required=False,
+    type=str
+)
+
+
+def parse_fieldset(value: str) -> Fieldset:
+    """Parse a comma separated list of dotted field paths"""
+    fieldset = {}
+    for path in filter(None, (part.strip() for part in value.split(','))):
+        node = fieldset
+        for name in path.split('.'):
+            node = node.setdefault(name, {})
+    return fieldset
+
+
+def _nested(field) -> Optional[serializers.Serializer]:
+    field = getattr(field, 'child', field)
+    return field if isinstance(field, serializers.Serializer) else None
+
+
+def trim_serializer(serializer, fieldset: Fieldset) -> None:
+    """Drop the fields that were not selected, selections on nested serializers are applied recursively"""
+    serializer = _nested(serializer)
+    for name in list(serializer.fields):
+        if name not in fieldset:
+            serializer.fields.pop(name)
+        elif fieldset[name] and _nested(serializer.fields[name]) is not None:
+            trim_serializer(serializer.fields[name], fieldset[name])
+
+
+def required_columns(serializer, model, prefix: str = '') -> Optional[Tuple[List[str], List[str]]]:
+    """
+    Work out the columns and forward relations needed to render a serializer
+
+    Returns None when a field is not backed by a plain model field path, e.g. a
+    method field or a property, in which case the queryset cannot be trimmed safely.
+    Reverse and many to many relations are loaded by separate queries and need no columns.
+    """
+    columns, relations = [], []
+    for field in _nested(serializer).fields.values():
+        if field.source == '*' or isinstance(field, serializers.SerializerMethodField):
+            return None
+
+        current, path = model, []
+        for attr in field.source.split('.'):
+            try:
+                model_field = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                return None
+            if path:
+                # a dotted source like `student_profile.matric` walks a forward relation
+                relations.append(prefix + '__'.join(path))
+            path.append(attr)
+            if model_field.one_to_many or model_field.many_to_many:
+                break
+            current = model_field.related_model
+        else:
+            column = prefix + '__'.join(path)
+            if _nested(field) is None or not model_field.is_relation:
+                columns.append(column)
+                continue
+            nested = required_columns(field, model_field.related_model, column + '__')
+            if nested is None:
+                return None
+            relations.append(column)
+            columns.extend(nested[0])
+            relations.extend(nested[1])
+    return columns, relations
+
+
+class SparseFieldsetMixin:
+    """
+    Lets clients pick the fields they render with ?fields=id,title,course.title
+
+    Unselected fields, including nested ones, are removed from the serializer so
+    they are never computed, and the queryset only loads the columns and joins
+    the selected relations that the remaining fields need. Only applies to
+    safe methods so writes keep validating every field.
+    """
+    fieldset_param = 'fields'
+
+    def get_fieldset(self) -> Optional[Fieldset]:
+        if self.request is None or self.request.method not in ('GET', 'HEAD'):
+            return None
+        value = self.request.query_params.get(self.fieldset_param)
+        return parse_fieldset(value) if value else None
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fieldset = self.get_fieldset()
+        if fieldset:
+            trim_serializer(serializer, fieldset)
+        return serializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if not self.get_fieldset():
+            return queryset
+
+        required = required_columns(self.get_serializer(), queryset.model)
+        if required is None:
+            return queryset
+        columns, relations = required
+
+        # cursors are built from the ordering fields so they always have to be loaded
+        ordering = getattr(getattr(self, 'paginator', None), 'ordering', None) or []
+        if isinstance(ordering, str):
+            ordering = [ordering]
+        columns.extend(field.lstrip('-') for field in ordering)
+
+        if not columns:
+            return queryset
+        # joins for relations that are no longer rendered would clash with their deferred columns
+        queryset = queryset.select_related(None)
+        if relations:
+            queryset = queryset.select_related(*relations)
+        return queryset.only(*columns)
@@ -30,6 +30,76 @@ environ.Env.read_env(BASE_DIR / '.env')
 RAPIDAPI_KEY = env('X_RAPIDAPI_KEY')
 RAPIDAPI_HOST = env('X_RAPIDAPI_HOST')
 
+# Code execution backends, either "judge0" or "local". Individual languages can be
+# routed to a different backend with a "language_id=backend" list, e.g. "71=local,63=local"
+CODE_EXECUTION_BACKEND = env('CODE_EXECUTION_BACKEND', default='judge0')
+CODE_EXECUTION_LANGUAGE_BACKENDS = {
+    int(language_id): backend
+    for language_id, backend in env.dict('CODE_EXECUTION_LANGUAGE_BACKENDS', default={}).items()
+}
+JUDGE0_BASE_URL = env('JUDGE0_BASE_URL', default='https://judge0-ce.p.rapidapi.com')
+
+# Maximum number of submissions Judge0 accepts in a single batch request and the
+# number of batch chunks that are dispatched concurrently
+JUDGE0_BATCH_SIZE = env.int('JUDGE0_BATCH_SIZE', default=20)
+JUDGE0_BATCH_WORKERS = env.int('JUDGE0_BATCH_WORKERS', default=8)
+
+# Public url of the Judge0 callback endpoint (.../api/v1/judge0/callback). When set,
+# Judge0 reports results to the callback endpoint instead of being polled
+JUDGE0_CALLBACK_URL = env('JUDGE0_CALLBACK_URL', default='')
+
+# Window in seconds during which submissions from concurrent gradings are coalesced
+# into shared batch requests, 0 disables micro-batching
+JUDGE0_MICRO_BATCH_WINDOW = env.float('JUDGE0_MICRO_BATCH_WINDOW', default=0.05)
+
+# Local runner, time limits are in seconds and the memory limit is the data segment size
+# in bytes, address space is not limited since runtimes like Node reserve a lot of it. Programs are
+# only sandboxed when LOCAL_RUNNER_USER names an unprivileged user, they then run as
+# that user without network access, which requires running the app as root. Keep
+# the application tree unreadable for that user. The process limit counts every
+# process and thread of the user running the programs. The output limit in bytes
+# applies to stdout and stderr each.
+LOCAL_RUNNER_USER = env('LOCAL_RUNNER_USER', default='')
+LOCAL_RUNNER_MAX_PROCESSES = env.int('LOCAL_RUNNER_MAX_PROCESSES', default=128)
+LOCAL_RUNNER_WORKERS = env.int('LOCAL_RUNNER_WORKERS', default=4)
+LOCAL_RUNNER_TIME_LIMIT = env.float('LOCAL_RUNNER_TIME_LIMIT', default=2)
+LOCAL_RUNNER_COMPILE_TIMEOUT = env.float('LOCAL_RUNNER_COMPILE_TIMEOUT', default=15)
+LOCAL_RUNNER_MEMORY_LIMIT = env.int('LOCAL_RUNNER_MEMORY_LIMIT', default=256 * 1024 * 1024)
+LOCAL_RUNNER_OUTPUT_LIMIT = env.int('LOCAL_RUNNER_OUTPUT_LIMIT', default=1024 * 1024)
+LOCAL_RUNNER_LANGUAGES = {
+    71: {'name': 'Python (3.8.1)', 'file': 'main.py', 'run': ['python3', 'main.py']},
+    100: {'name': 'Python (3.12.5)', 'file': 'main.py', 'run': ['python3', 'main.py']},
+    63: {'name': 'JavaScript (Node.js 12.14.0)', 'file': 'main.js', 'run': ['node', 'main.js']},
+    50: {'name': 'C (GCC 9.2.0)', 'file': 'main.c', 'compile': ['gcc', '-O2', '-o', 'main', 'main.c'], 'run': ['./main']},
+    54: {'name': 'C++ (GCC 9.2.0)', 'file': 'main.cpp', 'compile': ['g++', '-O2', '-o', 'main', 'main.cpp'], 'run': ['./main']},
+}
+
+# Limits on in-flight executions per process and across the cluster, times are in seconds
+EXECUTOR_MAX_IN_FLIGHT = env.int('EXECUTOR_MAX_IN_FLIGHT', default=16)
+EXECUTOR_CLUSTER_MAX_IN_FLIGHT = env.int('EXECUTOR_CLUSTER_MAX_IN_FLIGHT', default=64)
+EXECUTOR_CLUSTER_SLOT_TTL = env.int('EXECUTOR_CLUSTER_SLOT_TTL', default=5 * 60)
+EXECUTOR_SLOT_TIMEOUT = env.float('EXECUTOR_SLOT_TIMEOUT', default=30)
+
+# Circuit breaker around the code executor, opens when the failure rate within the
+# window crosses the threshold and rejects executions until the cooldown has passed
+EXECUTOR_BREAKER_WINDOW = env.int('EXECUTOR_BREAKER_WINDOW', default=60)
+EXECUTOR_BREAKER_MIN_CALLS = env.int('EXECUTOR_BREAKER_MIN_CALLS', default=10)
+EXECUTOR_BREAKER_FAILURE_RATE = env.float('EXECUTOR_BREAKER_FAILURE_RATE', default=0.5)
+EXECUTOR_BREAKER_SLOW_CALL = env.float('EXECUTOR_BREAKER_SLOW_CALL', default=20)
+EXECUTOR_BREAKER_COOLDOWN = env.int('EXECUTOR_BREAKER_COOLDOWN', default=30)
+
+# Judge0 HTTP connection pool, timeouts are in seconds
+JUDGE0_POOL_SIZE = env.int('JUDGE0_POOL_SIZE', default=20)
+JUDGE0_CONNECT_TIMEOUT = env.float('JUDGE0_CONNECT_TIMEOUT', default=3.05)
+JUDGE0_READ_TIMEOUT = env.float('JUDGE0_READ_TIMEOUT', default=15)
+JUDGE0_MAX_RETRIES = env.int('JUDGE0_MAX_RETRIES', default=3)
+JUDGE0_RETRY_BACKOFF = env.float('JUDGE0_RETRY_BACKOFF', default=0.3)
+
+# Judge0 result polling, delays are in seconds
+JUDGE0_POLL_INITIAL_DELAY = env.float('JUDGE0_POLL_INITIAL_DELAY', default=0.5)
+JUDGE0_POLL_MAX_DELAY = env.float('JUDGE0_POLL_MAX_DELAY', default=4)
+JUDGE0_POLL_TIMEOUT = env.float('JUDGE0_POLL_TIMEOUT', default=30)
+
 # Gemini API key
 GEMINI_API_KEY = env('GEMINI_API_KEY')
 
@@ -172,6 +242,10 @@ REST_FRAMEWORK = {
     }
 }
 
+# Cursor pagination of submission, result and feedback listings
+LISTING_PAGE_SIZE = env.int('LISTING_PAGE_SIZE', default=20)
+LISTING_MAX_PAGE_SIZE = env.int('LISTING_MAX_PAGE_SIZE', default=100)
+
 # Simple JWT settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timezone.timedelta(minutes=10),
@@ -256,6 +330,47 @@ CACHES = {
 
 CACHE_TTL = 60 * 15
 
+# Grading results cache, entries above the size limit are not cached
+GRADING_CACHE_TTL = env.int('GRADING_CACHE_TTL', default=60 * 60)
+GRADING_CACHE_MAX_ENTRY_BYTES = env.int('GRADING_CACHE_MAX_ENTRY_BYTES', default=64 * 1024)
+TEST_CASE_RESULT_CACHE_TTL = env.int('TEST_CASE_RESULT_CACHE_TTL', default=60 * 60 * 24)
+
+# Background grading workers
+GRADING_WORKERS = env.int('GRADING_WORKERS', default=8)
+TASKS_ALWAYS_EAGER = env.bool('TASKS_ALWAYS_EAGER', default=False)
+# Run gradings as coroutines on the event loop instead of the worker threads,
+# only enable when the project is served through ASGI
+GRADING_ON_EVENT_LOOP = env.bool('GRADING_ON_EVENT_LOOP', default=False)
+# Pending jobs not picked up and running jobs not finished within this many seconds
+# are considered lost by their worker, pending jobs are queued again and running jobs failed
+GRADING_JOB_TIMEOUT = env.int('GRADING_JOB_TIMEOUT', default=10 * 60)
+
+# Streaming of grading progress over server-sent events, times are in seconds
+GRADING_PROGRESS_TTL = env.int('GRADING_PROGRESS_TTL', default=10 * 60)
+GRADING_STREAM_INTERVAL = env.float('GRADING_STREAM_INTERVAL', default=0.5)
+GRADING_STREAM_TIMEOUT = env.float('GRADING_STREAM_TIMEOUT', default=120)
+
+# Gemini model used for AI feedback, the timeout is in seconds
+LLM_MODEL = env('LLM_MODEL', default='gemini-1.5-flash')
+LLM_TIMEOUT = env.float('LLM_TIMEOUT', default=30)
+
+# Background AI feedback generation, a feedback job for a submission is shared by
+# every request made while it is in flight for up to FEEDBACK_JOB_TIMEOUT seconds
+FEEDBACK_JOB_TIMEOUT = env.int('FEEDBACK_JOB_TIMEOUT', default=5 * 60)
+# Feedback jobs run on their own workers so grading load does not delay them
+FEEDBACK_WORKERS = env.int('FEEDBACK_WORKERS', default=4)
+# Feedback is shared by structurally identical submissions to an assignment for this many seconds
+FEEDBACK_CACHE_TTL = env.int('FEEDBACK_CACHE_TTL', default=60 * 60 * 24)
+# Streaming of feedback jobs over server-sent events, times are in seconds
+FEEDBACK_STREAM_INTERVAL = env.float('FEEDBACK_STREAM_INTERVAL', default=0.25)
+FEEDBACK_STREAM_TIMEOUT = env.float('FEEDBACK_STREAM_TIMEOUT', default=120)
+
+# Bulk regrades, timeouts are in seconds
+REGRADE_WORKERS = env.int('REGRADE_WORKERS', default=8)
+REGRADE_CHUNK_SIZE = env.int('REGRADE_CHUNK_SIZE', default=500)
+REGRADE_LOCK_TIMEOUT = env.int('REGRADE_LOCK_TIMEOUT', default=60 * 60)
+REGRADE_PROGRESS_TTL = env.int('REGRADE_PROGRESS_TTL', default=60 * 60 * 24)
+
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -1,6 +1,7 @@
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from account.models import CustomUser, Lecturer
+from .models import Course
 from django.urls import reverse
 
 
@@ -71,3 +72,17 @@ class TestCourseManagement(APITestCase):
         # Attempt to create the course
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_course_list_sparse_fieldset(self):
+        """Ensure clients can select the course fields they need"""
+        Course.objects.create(
+            title='Test Course',
+            lecturer=self.lecturer_user,
+            course_code='CSC401',
+            course_units=3
+        )
+        self.client.force_authenticate(user=self.lecturer_user)
+
+        response = self.client.get(reverse('course-list-create'), {'fields': 'title,lecturer.email'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [{'title': 'Test Course', 'lecturer': {'email': 'lecturer@example.com'}}])
@@ -6,9 +6,11 @@ from rest_framework.permissions import IsAuthenticated
 from .serializers import CourseSerializer, JoinCourseSerializer, MessageSerializer, CourseListSerializer
 from .models import Course
 from drf_spectacular.utils import extend_schema
+from checkmate.fieldsets import SparseFieldsetMixin, FIELDS_PARAMETER
 
 
-class CourseListCreateView(generics.ListCreateAPIView):
+@extend_schema(parameters=[FIELDS_PARAMETER])
+class CourseListCreateView(SparseFieldsetMixin, generics.ListCreateAPIView):
     """
     Create a new course or list exiting courses a user is teaching
     """
@@ -16,7 +18,7 @@ class CourseListCreateView(generics.ListCreateAPIView):
     serializer_class = CourseSerializer
 
     def get_queryset(self):
-        return Course.objects.filter(lecturer=self.request.user)
+        return Course.objects.filter(lecturer=self.request.user).select_related('lecturer')
 
     def create(self, request, *args, **kwargs):
         data = request.data.copy()
@@ -27,13 +29,14 @@ class CourseListCreateView(generics.ListCreateAPIView):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class CourseDetailView(generics.RetrieveAPIView):
+@extend_schema(parameters=[FIELDS_PARAMETER])
+class CourseDetailView(SparseFieldsetMixin, generics.RetrieveAPIView):
     """
     Retrieve, update or delete a course
     """
     permission_classes = [IsAuthenticated]
     serializer_class = CourseSerializer
-    queryset = Course.objects.all()
+    queryset = Course.objects.select_related('lecturer')
 
 
 class JoinCourseView(APIView):
@@ -69,7 +72,8 @@ class JoinCourseView(APIView):
         return Response({'message': f'You have successfully joined {course.course_code}-{course.title}'}, status=status.HTTP_200_OK)
 
 
-class StudentCourseListView(generics.ListAPIView):
+@extend_schema(parameters=[FIELDS_PARAMETER])
+class StudentCourseListView(SparseFieldsetMixin, generics.ListAPIView):
     """
     View to list courses a student is enrolled in
     """
@@ -77,7 +81,7 @@ class StudentCourseListView(generics.ListAPIView):
     serializer_class = CourseListSerializer
 
     def get_queryset(self):
-        return Course.objects.filter(students=self.request.user)
+        return Course.objects.filter(students=self.request.user).select_related('lecturer')
 
 
 class UnenrollView(APIView):